@@ -0,0 +1,37 @@
+import csv
+import io
+
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from .renderers import ORJSONRenderer
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser on top of orjson (UTF-8 bodies; NaN/Infinity are rejected like STRICT_JSON)."""
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class CSVParser(BaseParser):
+    """
+    text/csv body -> list of {header: cell} dicts (UTF-8, a BOM from Excel is
+    dropped). Empty cells are left out, so they read as "not given".
+    """
+    media_type = "text/csv"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            reader = csv.DictReader(io.StringIO(stream.read().decode("utf-8-sig")))
+            return [
+                {key.strip(): value for key, value in row.items() if key and value not in (None, "")}
+                for row in reader
+            ]
+        except (csv.Error, UnicodeDecodeError) as exc:
+            raise ParseError('CSV parse error - %s' % str(exc))
@@ -55,6 +55,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     "rest_framework",
     "rest_framework.authtoken",
@@ -131,6 +132,40 @@ EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = env("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = env("EMAIL_HOST_PASSWORD")
+EMAIL_TIMEOUT = 20
+
+# Mail goes through products.EmailOutbox and `manage.py run_email_worker`
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS = 8
+EMAIL_OUTBOX_BACKOFF = 30  # seconds before the first retry, doubled each attempt
+EMAIL_OUTBOX_BACKOFF_MAX = 60 * 60
+# How long a worker owns the rows it claimed; longer than a batch can take to
+# send (EMAIL_OUTBOX_BATCH_SIZE * EMAIL_TIMEOUT), after which they are retried
+EMAIL_OUTBOX_LEASE = 30 * 60
+EMAIL_WORKER_POLL_INTERVAL = 5
+
+# Stock reservations for initiated orders (products.inventory). "redis" keeps the
+# availability counters in Redis; "db" always locks the product rows instead.
+INVENTORY_BACKEND = "redis"
+INVENTORY_HOLD_TTL = 60 * 60
+INVENTORY_PAID_HOLD_TTL = 3 * 24 * 60 * 60  # once the customer says they've paid
+# Seconds reconcile_inventory leaves a product's held counter alone after a
+# reservation or release, long enough for that transaction to finish
+INVENTORY_IN_FLIGHT_TTL = 60
+
+# Most orders one POST to /api/products/orders/bulk-status/ may confirm or reverse
+ORDER_BULK_MAX = 500
+
+# Rows fetched per server-side cursor round trip (and written per chunk) by the
+# CSV/NDJSON exports (products.exports)
+EXPORT_CHUNK_SIZE = 2000
+
+# Most rows one POST to /api/products/products/bulk/ may create or update
+PRODUCT_IMPORT_MAX = 1000
+
+# Unverified sign-ups (userapp.pending)
+PENDING_REGISTRATION_TTL = 30 * 60
+PENDING_REGISTRATION_MAX_ATTEMPTS = 5
 
 
 
@@ -228,13 +263,37 @@ CORS_ALLOW_CREDENTIALS = True
 
 # REST Framework + JWT
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": ("rest_framework_simplejwt.authentication.JWTAuthentication",),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("userapp.authentication.ClaimsJWTAuthentication",),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.AllowAny",),
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
+    "DEFAULT_RENDERER_CLASSES": (
+        "herome_fab.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "herome_fab.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 12,
+    # Heroku's router appends the client address to X-Forwarded-For
+    "NUM_PROXIES": 1,
 }
 
+# Token buckets for the expensive auth endpoints (userapp.throttling), keyed by
+# the view's throttle_scope: burst size / refill period per client IP and per
+# submitted email or username.
+AUTH_THROTTLE_RATES = {
+    "login": {"ip": "20/min", "identity": "5/min"},
+    "register": {"ip": "10/hour", "identity": "3/hour"},
+    "verify": {"ip": "30/hour", "identity": "10/hour"},
+    "password_reset": {"ip": "10/hour", "identity": "3/hour"},
+}
+
+# Lifetime of the cached user rows behind ClaimsJWTAuthentication
+USER_CACHE_TIMEOUT = 5 * 60
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
@@ -245,6 +304,26 @@ SIMPLE_JWT = {
 
 
 
+# Catalog responses are invalidated by generation bumps (products/caching.py),
+# so the TTL is only a memory bound
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 6
+# caching.read_through: how long an expired entry may still be served while one
+# worker refreshes it, and how long that worker may hold the recompute lock
+CACHE_STALE_GRACE = 60 * 10
+CACHE_LOCK_TIMEOUT = 10
+# cached payloads at least this big also keep a pre-gzipped copy
+CACHE_GZIP_MIN_BYTES = 1024
+# Cache-Control for public catalog responses (browsers: max_age, CDN: s_maxage)
+CATALOG_HTTP_CACHE_CONTROL = {"max_age": 60, "s_maxage": 300, "stale_while_revalidate": 600}
+
+# Typeahead (/products/suggest/) results: short TTL, also sent as Cache-Control max-age
+SUGGEST_CACHE_TIMEOUT = 60
+SUGGEST_MAX_RESULTS = 10
+
+# Price ranges (NGN) reported in the product list "facets" block; None = open ended
+PRICE_FACET_BUCKETS = [(0, 10000), (10000, 25000), (25000, 50000), (50000, 100000), (100000, None)]
+
+
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
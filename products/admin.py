@@ -1,6 +1,10 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.utils import timezone
+from django.db import transaction
 from .models import Category, Product, Review, Order
-from .models import Sale
+from .models import Sale, EmailOutbox
+from .orders import confirm_payments
+from rest_framework.exceptions import ValidationError
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -9,6 +13,7 @@ class CategoryAdmin(admin.ModelAdmin):
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ("id","name","price","category","available","pieces_available","created_at", "sizes", "description")
+    readonly_fields = ("review_count","rating_sum","rating_1_count","rating_2_count","rating_3_count","rating_4_count","rating_5_count","avg_rating")
     list_filter = ("category","available","gender")
     search_fields = ("name","description")
 
@@ -16,10 +21,32 @@ class ProductAdmin(admin.ModelAdmin):
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ("id","product","user","rating","created_at")
 
+    def save_model(self, request, obj, form, change):
+        # creates and deletes are picked up by products.signals; a changed rating
+        # (or product) moves one vote between summaries here
+        if change and {"rating", "product"} & set(form.changed_data):
+            old = Review.objects.get(pk=obj.pk)
+            with transaction.atomic():
+                super().save_model(request, obj, form, change)
+                Product.objects.filter(pk=old.product_id).adjust_rating_summary(old.rating, -1)
+                Product.objects.filter(pk=obj.product_id).adjust_rating_summary(obj.rating, 1)
+        else:
+            super().save_model(request, obj, form, change)
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ("id","reference","user","amount","status", "confirm_status", "created_at")
     readonly_fields = ("metadata",)
+    actions = ["confirm_payments"]
+
+    @admin.action(description="Confirm payment for selected orders")
+    def confirm_payments(self, request, queryset):
+        try:
+            orders = confirm_payments(queryset)
+        except ValidationError as e:
+            self.message_user(request, f"Nothing confirmed: {e.detail['items']}", messages.ERROR)
+            return
+        self.message_user(request, f"Confirmed {len(orders)} order(s).")
 
 @admin.register(Sale)
 class SaleAdmin(admin.ModelAdmin):
@@ -31,3 +58,16 @@ class SaleAdmin(admin.ModelAdmin):
         return "Profit" if obj.is_profit else "Loss"
     profit_or_loss_label.short_description = "Profit / Loss"
 
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ("id", "subject", "to", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("subject",)
+    readonly_fields = ("created_at", "sent_at", "last_error")
+    actions = ["requeue"]
+
+    @admin.action(description="Requeue selected messages")
+    def requeue(self, request, queryset):
+        # not rows a worker is sending right now
+        queryset.exclude(status__in=("sent", "sending")).update(status="pending", attempts=0, next_attempt_at=timezone.now())
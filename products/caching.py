@@ -0,0 +1,184 @@
+import gzip
+import hashlib
+import json
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from herome_fab.renderers import ORJSONRenderer
+from rest_framework.response import Response
+
+# Cache namespaces. Every cached catalog entry embeds the current generation of
+# the namespaces it depends on, so a write invalidates all of them with one INCR
+# instead of a SCAN over the keyspace; old entries simply age out.
+PRODUCTS = "products"
+CATEGORIES = "categories"
+RELATED = "related"
+REVIEWS = "reviews"
+
+
+def _generation_key(namespace):
+    return f"cachegen:{namespace}"
+
+
+def _fresh_generation():
+    # time based, so a generation key that was evicted never restarts at a value
+    # that old entries were stored under
+    return int(time.time() * 1000)
+
+
+def generations(*namespaces):
+    keys = [_generation_key(ns) for ns in namespaces]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _fresh_generation(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def versioned_key(key, *namespaces):
+    """key tagged with the generations of the namespaces it depends on."""
+    return f"{key}@" + ".".join(str(gen) for gen in generations(*namespaces))
+
+
+def bump(*namespaces):
+    """Invalidate every entry depending on these namespaces (O(1) per namespace)."""
+    for namespace in namespaces:
+        try:
+            cache.incr(_generation_key(namespace))
+        except ValueError:
+            cache.set(_generation_key(namespace), _fresh_generation(), None)
+
+
+def _recompute(key, compute, timeout):
+    started = time.time()
+    value = compute()
+    took = time.time() - started
+    # (value, soft expiry, recompute cost); kept past the soft expiry so it can be served stale
+    cache.set(key, (value, started + timeout, took), timeout + settings.CACHE_STALE_GRACE)
+    return value
+
+
+def read_through(key, compute, timeout, beta=1.0):
+    """
+    Cached compute() for hot keys, safe against stampedes:
+
+    * single flight: on a miss only the worker holding the Redis lock
+      (SET NX with an expiry) recomputes; the others wait for its result;
+    * stale-while-revalidate: after `timeout` the entry is still served for
+      CACHE_STALE_GRACE seconds while one worker refreshes it;
+    * probabilistic early refresh (XFetch): requests near the soft expiry
+      occasionally refresh ahead of time, weighted by how slow compute() is.
+    """
+    lock_key = f"lock:{key}"
+    entry = cache.get(key)
+
+    if entry is not None:
+        value, soft_expiry, took = entry
+        if time.time() - took * beta * math.log(1.0 - random.random()) < soft_expiry:
+            return value
+        if cache.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT):
+            try:
+                return _recompute(key, compute, timeout)
+            finally:
+                cache.delete(lock_key)
+        return value
+
+    # miss: whoever gets the lock computes, the rest wait for its value rather
+    # than piling on. If the holder gives up (compute() raised) or its lock
+    # expires, the next waiter to get the lock computes in its place, so a
+    # failure never sends every waiter to compute() at once
+    waited = False
+    while not cache.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT):
+        waited = True
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    try:
+        # the holder may have stored the value just before letting go
+        entry = cache.get(key) if waited else None
+        return entry[0] if entry is not None else _recompute(key, compute, timeout)
+    finally:
+        cache.delete(lock_key)
+
+
+def render_payload(data):
+    """Render once at fill time: JSON body, gzip copy (if worth it), content type."""
+    body = ORJSONRenderer().render(data)
+    return {
+        "body": body,
+        "gzip": gzip.compress(body, 6) if len(body) >= settings.CACHE_GZIP_MIN_BYTES else None,
+        "content_type": "application/json",
+        "last_modified": time.time(),
+    }
+
+
+def key_etag(key):
+    """
+    Weak ETag for a versioned cache key. The key already carries the generations
+    of everything the body depends on (bumped on every Product/Category/Review
+    write, so it moves whenever max(updated_at) would), so the tag is known
+    before any body exists.
+    """
+    return 'W/"%s"' % hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def patch_catalog_cache_control(response):
+    """Public catalog policy: short browser max-age, longer shared (CDN) s-maxage."""
+    patch_cache_control(response, public=True, **settings.CATALOG_HTTP_CACHE_CONTROL)
+    patch_vary_headers(response, ("Accept", "Accept-Encoding"))
+    return response
+
+
+def not_modified(etag):
+    response = HttpResponseNotModified()
+    response["ETag"] = etag
+    return patch_catalog_cache_control(response)
+
+
+def payload_response(request, payload):
+    """Serve a cached payload as-is; JSON clients skip DRF's renderer entirely."""
+    if request.accepted_renderer.format != "json":
+        # browsable API and friends: hand the data back to DRF
+        return Response(json.loads(payload["body"]))
+    accepts_gzip = "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", "")
+    if payload["gzip"] is not None and accepts_gzip:
+        response = HttpResponse(payload["gzip"], content_type=payload["content_type"])
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = HttpResponse(payload["body"], content_type=payload["content_type"])
+    response["Last-Modified"] = http_date(payload["last_modified"])
+    return response
+
+
+def cached_response(request, key, build, timeout):
+    """
+    read_through() over the rendered payload of build()'s data, with conditional
+    GET: a matching If-None-Match is answered with 304 before the payload (let
+    alone the database) is touched; If-Modified-Since is checked against the
+    payload's fill time.
+    """
+    is_json = request.accepted_renderer.format == "json"
+    etag = key_etag(key)
+    if is_json:
+        early = get_conditional_response(request._request, etag=etag)
+        if early is not None:
+            return not_modified(etag) if early.status_code == 304 else early
+
+    payload = read_through(key, lambda: render_payload(build()), timeout)
+    response = payload_response(request, payload)
+    if not is_json:
+        return response
+    response["ETag"] = etag
+    patch_catalog_cache_control(response)
+    conditional = get_conditional_response(
+        request._request, etag=etag, last_modified=int(payload["last_modified"]), response=response
+    )
+    return conditional if conditional is not None else response
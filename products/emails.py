@@ -0,0 +1,215 @@
+import random
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.db.models import F
+from django.template import Context, Engine
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .models import EmailOutbox
+from .utils import snapshot_lines
+
+HTML_LAYOUT = "email_template.html"
+TEXT_LAYOUT = "emails/layout.txt"
+_BODY = "\x00body\x00"
+
+
+class EmailKind:
+    """
+    A named transactional message: subject template plus templates/emails/<name>.html
+    (fragment placed inside email_template.html) and <name>.txt (the text part).
+    Templates are compiled on first use and kept for the life of the process.
+    """
+    def __init__(self, name, subject):
+        self.name = name
+        self.subject_source = subject
+
+    @property
+    def compiled(self):
+        if not hasattr(self, "_compiled"):
+            self._compiled = (
+                Engine.get_default().from_string(self.subject_source),
+                get_template(f"emails/{self.name}.html").template,
+                get_template(f"emails/{self.name}.txt").template,
+            )
+        return self._compiled
+
+
+EMAIL_KINDS = {kind.name: kind for kind in (
+    EmailKind("payment_received_admin", "New Payment Received - {{ reference }}"),
+    EmailKind("payment_received_customer", "Payment Received - Reference {{ reference }}"),
+    EmailKind("payment_confirmed", "Payment Confirmed - Reference {{ reference }}"),
+    EmailKind("verify_account", "Verify Your Herome_Fab Account"),
+    EmailKind("password_reset", "Reset Your Password"),
+)}
+
+
+@lru_cache(maxsize=4)
+def layout_shell(template_name, year):
+    """
+    The layout rendered once (logo, CSS, footer year) around a marker and split
+    in two, so each message is just head + body + tail.
+    """
+    template = get_template(template_name)
+    rendered = template.render({
+        "logo_url": f"{settings.SITE_URL}/static/images/heromefab.jpg",
+        "site_url": settings.SITE_URL,
+        "year": year,
+        "body_content": _BODY,
+    })
+    head, tail = rendered.split(_BODY)
+    return head, tail
+
+
+def render_emails(kind, contexts):
+    """
+    Render [context, ...] for one kind in a single pass: templates and layout are
+    looked up once and one Context per part is reused, pushing each row on top.
+    Returns [(subject, html, text), ...].
+    """
+    subject_t, html_t, text_t = EMAIL_KINDS[kind].compiled
+    year = timezone.localdate().year
+    html_head, html_tail = layout_shell(HTML_LAYOUT, year)
+    text_head, text_tail = layout_shell(TEXT_LAYOUT, year)
+    html_ctx, plain_ctx = Context(), Context(autoescape=False)
+
+    rendered = []
+    for context in contexts:
+        with html_ctx.push(context), plain_ctx.push(context):
+            subject = " ".join(subject_t.render(plain_ctx).split())
+            html = html_head + html_t.render(html_ctx) + html_tail
+            text = text_head + text_t.render(plain_ctx).strip() + text_tail
+        rendered.append((subject, html, text))
+    return rendered
+
+
+def render_email(kind, context):
+    return render_emails(kind, [context])[0]
+
+
+def order_email_context(order):
+    names = [item.name for item in order.items.all()]
+    if not names:
+        # placed before OrderItem and not reached by backfill_order_items yet
+        names = [item.get("name", "") for _pid, _qty, item in snapshot_lines(order.metadata)]
+    return {
+        "customer_name": order.user.username,
+        "product_names": ", ".join(names) if names else "Product(s)",
+        "amount": str(order.amount),
+        "reference": order.reference,
+    }
+
+
+def queue_email(subject, html, to, from_email=None, text=None):
+    """
+    Put a message on the outbox instead of talking SMTP inside the request.
+    Call it inside the transaction that makes the change the mail is about: if
+    that rolls back, so does the mail.
+    """
+    return EmailOutbox.objects.create(
+        subject=subject,
+        body=text if text is not None else strip_tags(html),
+        html=html,
+        to=list(to),
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+
+
+def queue_kind_emails(kind, messages, from_email=None):
+    """Render and queue [(to, context), ...] of one kind with a single INSERT."""
+    messages = list(messages)
+    rendered = render_emails(kind, [context for _to, context in messages])
+    return EmailOutbox.objects.bulk_create([
+        EmailOutbox(
+            subject=subject, body=text, html=html, to=list(to),
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        )
+        for (to, _context), (subject, html, text) in zip(messages, rendered)
+    ])
+
+
+def queue_kind_email(kind, to, context, from_email=None):
+    return queue_kind_emails(kind, [(to, context)], from_email)[0]
+
+
+def build_message(row, connection):
+    msg = EmailMultiAlternatives(row.subject, row.body, row.from_email, row.to, connection=connection)
+    if row.html:
+        msg.attach_alternative(row.html, "text/html")
+    return msg
+
+
+def retry_delay(attempts):
+    """Exponential backoff with a little jitter so failed rows don't retry in lockstep."""
+    delay = min(settings.EMAIL_OUTBOX_BACKOFF * 2 ** (attempts - 1), settings.EMAIL_OUTBOX_BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_due(batch_size):
+    """
+    Claim up to batch_size due rows in a short transaction: SKIP LOCKED, so
+    several workers never pick the same row, then marked "sending" with a lease
+    until next_attempt_at. Rows of a worker that died mid-batch come due again
+    when the lease runs out. Each claim counts as an attempt.
+    """
+    now = timezone.now()
+    lease = now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE)
+    with transaction.atomic():
+        batch = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status__in=("pending", "sending"), next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        if batch:
+            EmailOutbox.objects.filter(pk__in=[row.pk for row in batch]).update(
+                status="sending", attempts=F("attempts") + 1, next_attempt_at=lease,
+            )
+    for row in batch:
+        row.status, row.attempts, row.next_attempt_at = "sending", row.attempts + 1, lease
+    return batch, lease
+
+
+def record_results(batch, lease):
+    """Store the outcome of a claimed batch, skipping rows whose lease was lost to another worker."""
+    with transaction.atomic():
+        mine = set(
+            EmailOutbox.objects.select_for_update()
+            .filter(pk__in=[row.pk for row in batch], status="sending", next_attempt_at=lease)
+            .values_list("pk", flat=True)
+        )
+        EmailOutbox.objects.bulk_update(
+            [row for row in batch if row.pk in mine], ["status", "last_error", "next_attempt_at", "sent_at"]
+        )
+
+
+def send_due(connection, batch_size=None):
+    """
+    Deliver one batch of due outbox rows over `connection` (an open mail backend,
+    reused across calls). The rows are claimed and their results recorded in two
+    short transactions; SMTP happens in between, holding no locks. Returns the batch.
+    """
+    batch, lease = claim_due(batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    for row in batch:
+        try:
+            # no-op while the connection is up; reconnects after a failure
+            connection.open()
+            build_message(row, connection).send(fail_silently=False)
+        except Exception as e:
+            connection.close()
+            row.last_error = f"{type(e).__name__}: {e}"
+            if row.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                row.status = "dead"
+            else:
+                row.status = "pending"
+                row.next_attempt_at = timezone.now() + retry_delay(row.attempts)
+        else:
+            row.status = "sent"
+            row.sent_at = timezone.now()
+    if batch:
+        record_results(batch, lease)
+    return batch
@@ -0,0 +1,229 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import CharField, Count, F, Func, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from . import caching
+from .models import GENDER_CHOICES, Order, Product
+
+FACET_DOMAINS_CACHE_KEY = "products:facets:domains"
+FACET_DOMAIN_LIMIT = 50
+
+
+def _csv(params, name):
+    return sorted({v.strip() for v in params.get(name, "").split(",") if v.strip()})
+
+
+def _price(params, name):
+    raw = params.get(name)
+    if not raw:
+        return None
+    try:
+        return Decimal(raw)
+    except InvalidOperation:
+        raise ValidationError({name: "must be a number"})
+
+
+def facet_domains():
+    """Colors and sizes present in the active catalog (cached until the next product write)."""
+    key = caching.versioned_key(FACET_DOMAINS_CACHE_KEY, caching.PRODUCTS)
+    domains = cache.get(key)
+    if domains is None:
+        active = Product.objects.filter(is_active=True).order_by()
+        colors = active.exclude(color="").values_list("color", flat=True).distinct()
+        sizes = (
+            active.annotate(size=Func(F("sizes"), function="unnest", output_field=CharField()))
+            .values_list("size", flat=True)
+            .distinct()
+        )
+        domains = {
+            "color": sorted(colors[:FACET_DOMAIN_LIMIT]),
+            "size": sorted(sizes[:FACET_DOMAIN_LIMIT]),
+        }
+        cache.set(key, domains, settings.CATALOG_CACHE_TIMEOUT)
+    return domains
+
+
+class ProductFacets:
+    """
+    Facet filters for the product list: ?gender=, ?color=, ?size= (comma separated,
+    OR within a facet), ?min_price= / ?max_price= and ?in_stock=true.
+
+    Counts are disjunctive: each facet is counted with every *other* selected
+    facet applied, so picking "red" still shows how many blue items there are.
+    """
+    def __init__(self, params):
+        self.gender = _csv(params, "gender")
+        self.color = _csv(params, "color")
+        self.size = _csv(params, "size")
+        self.min_price = _price(params, "min_price")
+        self.max_price = _price(params, "max_price")
+        self.in_stock = params.get("in_stock", "").lower() in ("1", "true", "yes")
+
+    def conditions(self):
+        """{facet: Q} for every facet the request narrows on."""
+        conds = {}
+        if self.gender:
+            conds["gender"] = Q(gender__in=self.gender)
+        if self.color:
+            conds["color"] = Q(color__in=self.color)
+        if self.size:
+            conds["size"] = Q(sizes__overlap=self.size)
+        price = Q()
+        if self.min_price is not None:
+            price &= Q(price__gte=self.min_price)
+        if self.max_price is not None:
+            price &= Q(price__lte=self.max_price)
+        if price:
+            conds["price"] = price
+        if self.in_stock:
+            conds["in_stock"] = Q(available=True, pieces_available__gt=0)
+        return conds
+
+    def filter(self, qs):
+        return qs.filter(*self.conditions().values())
+
+    def counts(self, qs):
+        """All facet counts for qs (the list queryset *before* facet filters) in one query."""
+        conds = self.conditions()
+
+        def others(facet):
+            q = Q()
+            for name, cond in conds.items():
+                if name != facet:
+                    q &= cond
+            return q
+
+        domains = facet_domains()
+        buckets = settings.PRICE_FACET_BUCKETS
+        aggregates = {}
+        for value, _label in GENDER_CHOICES:
+            aggregates[f"gender:{value}"] = Count("pk", filter=others("gender") & Q(gender=value))
+        for value in domains["color"]:
+            aggregates[f"color:{value}"] = Count("pk", filter=others("color") & Q(color=value))
+        for value in domains["size"]:
+            aggregates[f"size:{value}"] = Count("pk", filter=others("size") & Q(sizes__contains=[value]))
+        for low, high in buckets:
+            bucket = Q(price__gte=low) & (Q(price__lt=high) if high is not None else Q())
+            aggregates[f"price:{low}-{high or ''}"] = Count("pk", filter=others("price") & bucket)
+        aggregates["in_stock:true"] = Count(
+            "pk", filter=others("in_stock") & Q(available=True, pieces_available__gt=0)
+        )
+
+        # aggregate() labels can't hold arbitrary text, so index them
+        labels = list(aggregates)
+        row = qs.order_by().aggregate(**{f"f{i}": agg for i, agg in enumerate(aggregates.values())})
+
+        facets = {"gender": {}, "color": {}, "size": {}, "price": {}, "in_stock": {}}
+        for i, label in enumerate(labels):
+            facet, value = label.split(":", 1)
+            facets[facet][value] = row[f"f{i}"]
+        return facets
+
+    def cache_fragment(self):
+        """Normalised filter combination for cache keys."""
+        def num(value):
+            return "" if value is None else f"{value.normalize():f}"
+        return (
+            f"gender={','.join(self.gender)}:color={','.join(self.color)}:size={','.join(self.size)}"
+            f":price={num(self.min_price)}-{num(self.max_price)}:in_stock={int(self.in_stock)}"
+        )
+
+
+def _moment(params, name, end=False):
+    """?name= as an aware datetime; a bare date means the start (or end) of that day."""
+    raw = params.get(name)
+    if not raw:
+        return None
+    try:
+        # date first: parse_datetime also accepts a bare date (as midnight)
+        day = parse_date(raw)
+        value = None if day else parse_datetime(raw)
+    except ValueError:
+        value = day = None
+    if day is not None:
+        value = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    if value is None:
+        raise ValidationError({name: "must be a date (YYYY-MM-DD) or an ISO 8601 datetime"})
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+class OrderFilters:
+    """
+    Server-side filters for the order list: ?status= and ?confirm_status=
+    (comma separated), ?from= / ?to= on created_at (dates are whole days),
+    ?reference= (prefix) and, for staff listings, ?user=<id>. Each combination
+    is backed by an index that ends in (created_at, id), so the keyset page
+    stays a range scan.
+    """
+    def __init__(self, params):
+        self.status = self._choices(params, "status", Order.STATUS_CHOICES)
+        self.confirm_status = self._choices(
+            params, "confirm_status", Order._meta.get_field("confirm_status").choices
+        )
+        self.created_from = _moment(params, "from")
+        self.created_to = _moment(params, "to", end=True)
+        self.reference = params.get("reference", "").strip()
+        user = params.get("user", "").strip()
+        if user and not user.isdigit():
+            raise ValidationError({"user": "must be a user id"})
+        self.user = int(user) if user else None
+
+    @staticmethod
+    def _choices(params, name, choices):
+        values = _csv(params, name)
+        allowed = {value for value, _label in choices}
+        unknown = [v for v in values if v not in allowed]
+        if unknown:
+            raise ValidationError({name: f"unknown value(s): {', '.join(unknown)}"})
+        return values
+
+    def filter(self, qs, allow_user=False):
+        if self.status:
+            qs = qs.filter(status__in=self.status)
+        if self.confirm_status:
+            qs = qs.filter(confirm_status__in=self.confirm_status)
+        if self.created_from:
+            qs = qs.filter(created_at__gte=self.created_from)
+        if self.created_to:
+            # a bare ?to= date has been moved to the next midnight
+            qs = qs.filter(created_at__lt=self.created_to)
+        if self.reference:
+            qs = qs.filter(reference__startswith=self.reference)
+        if allow_user and self.user is not None:
+            qs = qs.filter(user_id=self.user)
+        return qs
+
+
+class SaleFilters:
+    """?from= / ?to= (inclusive dates) on Sale.date_paid."""
+    def __init__(self, params):
+        self.date_from = self._day(params, "from")
+        self.date_to = self._day(params, "to")
+
+    @staticmethod
+    def _day(params, name):
+        raw = params.get(name)
+        if not raw:
+            return None
+        try:
+            day = parse_date(raw)
+        except ValueError:
+            day = None
+        if day is None:
+            raise ValidationError({name: "must be a date (YYYY-MM-DD)"})
+        return day
+
+    def filter(self, qs):
+        if self.date_from:
+            qs = qs.filter(date_paid__gte=self.date_from)
+        if self.date_to:
+            qs = qs.filter(date_paid__lte=self.date_to)
+        return qs
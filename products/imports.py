@@ -0,0 +1,171 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import caching, inventory
+from .models import Category, Product
+from .serializers import ProductImportSerializer
+from .utils import SLUG_ATTEMPTS, allocate_unique_slugs
+
+# Bulk product import. A batch is validated as a whole (rows, then one query
+# each for the categories and products it refers to) and written with one
+# bulk_create and one bulk_update. The per-product signals don't fire, so the
+# search vectors, stock counters and cache generations are refreshed once for
+# the batch instead of once per product.
+
+
+class ImportPlan:
+    def __init__(self):
+        self.creates = []
+        self.updates = []
+        self.update_rows = []  # batch index of each update, for errors found at write time
+        self.update_fields = set()
+        # slugs the rows set explicitly (creates and renames)
+        self.slugs = set()
+
+
+def _resolve_categories(refs):
+    """{ref: Category}; an all-digit ref is an id, or failing that a slug ("2024")."""
+    ids = {int(ref) for ref in refs if ref.isdigit()}
+    by_pk, by_slug = {}, {}
+    for category in Category.objects.filter(Q(pk__in=ids) | Q(slug__in=refs)):
+        by_pk[str(category.pk)] = by_slug[category.slug] = category
+    return {ref: by_pk.get(ref) or by_slug[ref] for ref in refs if ref in by_pk or ref in by_slug}
+
+
+def _existing_products(rows):
+    ids = {row["id"] for row in rows if "id" in row}
+    slugs = {row["slug"] for row in rows if "slug" in row}
+    by_id, by_slug = {}, {}
+    for product in Product.objects.filter(Q(pk__in=ids) | Q(slug__in=slugs)):
+        by_id[product.pk] = by_slug[product.slug] = product
+    return by_id, by_slug
+
+
+def plan_import(rows):
+    """
+    Validate a batch of row dicts and work out what to create and update.
+    Raises ValidationError with {"rows": {index: errors}} covering every bad
+    row; nothing is written.
+    """
+    if not isinstance(rows, list):
+        raise ValidationError({"detail": "Expected a list of products."})
+    # field checks row by row (no queries), so every bad row is reported
+    valid, errors = [], {}
+    for i, data in enumerate(rows):
+        serializer = ProductImportSerializer(data=data)
+        if serializer.is_valid():
+            valid.append((i, dict(serializer.validated_data)))
+        else:
+            errors[i] = serializer.errors
+
+    categories = _resolve_categories({row["category"] for _i, row in valid if row.get("category")})
+    by_id, by_slug = _existing_products([row for _i, row in valid])
+
+    plan, seen = ImportPlan(), set()
+    for i, row in valid:
+        pk, slug = row.pop("id", None), row.get("slug")
+        if "category" in row:
+            ref = row.pop("category")
+            if ref and ref not in categories:
+                errors[i] = {"category": [f"No category with id or slug {ref!r}."]}
+                continue
+            row["category"] = categories.get(ref)
+
+        product = by_id.get(pk) if pk else by_slug.get(slug)
+        if pk and product is None:
+            errors[i] = {"id": [f"No product with id {pk}."]}
+            continue
+        if pk and slug and by_slug.get(slug, product) != product:
+            errors[i] = {"slug": [f"Slug {slug!r} is already used by product {by_slug[slug].pk}."]}
+            continue
+        key = ("product", product.pk) if product else ("slug", slug)
+        if key in seen and (product or slug):
+            errors[i] = {"non_field_errors": ["This product appears more than once in the batch."]}
+            continue
+        seen.add(key)
+        if slug and slug in plan.slugs:
+            errors[i] = {"slug": [f"Slug {slug!r} is set by another row in the batch."]}
+            continue
+        if slug:
+            plan.slugs.add(slug)
+
+        if product is None:
+            missing = [field for field in ("name", "price") if field not in row]
+            if missing:
+                errors[i] = {field: ["This field is required for a new product."] for field in missing}
+                continue
+            plan.creates.append(Product(**row))
+        else:
+            for field, value in row.items():
+                setattr(product, field, value)
+            plan.updates.append(product)
+            plan.update_rows.append(i)
+            plan.update_fields.update(row)
+    if errors:
+        raise ValidationError({"rows": dict(sorted(errors.items()))})
+    return plan
+
+
+def _create(products, reserved):
+    """
+    bulk_create, allocating the missing slugs in one query (clear of the
+    `reserved` slugs the batch sets) and retrying if another worker took one.
+    """
+    auto = [product for product in products if not product.slug]
+    for attempt in range(SLUG_ATTEMPTS):
+        for product, slug in zip(auto, allocate_unique_slugs(Product, [p.name for p in auto], reserved=reserved)):
+            product.slug = slug
+        try:
+            with transaction.atomic():
+                return Product.objects.bulk_create(products)
+        except IntegrityError:
+            if not auto or attempt == SLUG_ATTEMPTS - 1:
+                raise ValidationError({"slug": ["Slugs clashed with products saved at the same time; try again."]})
+            for product in auto:
+                product.slug = ""
+
+
+def _taken_slugs(plan):
+    """{index: errors} for the update rows whose slug another product now holds."""
+    owners = dict(Product.objects.filter(slug__in=[p.slug for p in plan.updates]).values_list("slug", "pk"))
+    return {
+        i: {"slug": [f"Slug {product.slug!r} was just taken by product {owners[product.slug]}."]}
+        for i, product in zip(plan.update_rows, plan.updates)
+        if owners.get(product.slug, product.pk) != product.pk
+    }
+
+
+def _update(plan):
+    """bulk_update, reporting the rows whose new slug another worker saved first."""
+    now = timezone.now()
+    for product in plan.updates:
+        product.updated_at = now
+    try:
+        with transaction.atomic():
+            Product.objects.bulk_update(plan.updates, sorted(plan.update_fields) + ["updated_at"])
+    except IntegrityError:
+        taken = _taken_slugs(plan)
+        if taken:
+            raise ValidationError({"rows": taken})
+        raise ValidationError({"slug": ["Slugs clashed with products saved at the same time; try again."]})
+
+
+def apply_import(plan):
+    """Write a plan from plan_import() in one transaction; returns (created, updated) products."""
+    with transaction.atomic():
+        created = _create(plan.creates, plan.slugs) if plan.creates else []
+        if plan.updates:
+            _update(plan)
+        pks = [product.pk for product in created + plan.updates]
+        Product.objects.filter(pk__in=pks).update_search_vector()
+
+        stock_changed = [product.pk for product in plan.updates] if "pieces_available" in plan.update_fields else []
+        transaction.on_commit(lambda: inventory.forget_stock(stock_changed))
+        transaction.on_commit(lambda: caching.bump(caching.PRODUCTS, caching.RELATED))
+    return created, plan.updates
+
+
+def import_products(rows):
+    return apply_import(plan_import(rows))
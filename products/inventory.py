@@ -0,0 +1,305 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, Value, When
+from django.utils import timezone
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from rest_framework.exceptions import ValidationError
+
+from . import caching
+from .models import Product, StockHold
+from .utils import snapshot_lines
+
+logger = logging.getLogger(__name__)
+
+# Reservations. An initiated order holds stock (StockHold rows) instead of
+# decrementing it; confirming the payment turns the holds into a real
+# pieces_available decrement, reversal or expiry gives them back.
+#
+# Whether a checkout fits is decided in Redis so hot products need no row
+# locks: per product "stock:onhand:<id>" mirrors pieces_available and
+# "stock:held:<id>" counts units under hold. StockHold is the source of truth;
+# reconcile_inventory (the Procfile clock) repairs the counters and expires
+# holds. If Redis is unreachable the check falls back to locking the product
+# rows.
+
+# KEYS = onhand1, held1, inflight1, onhand2, ...; ARGV = inflight ms, qty1, seed1, qty2, seed2, ...
+# Returns -1 if an onhand counter is missing and has no seed (reserve() then
+# reads the stock under lock and calls again). Takes every hold or none and
+# marks each product in flight; returns 0, or the 1-based position of the
+# short product.
+RESERVE_LUA = """
+for p = 0, #KEYS / 3 - 1 do
+    local onhand = tonumber(redis.call('GET', KEYS[3 * p + 1]))
+    if not onhand then
+        onhand = tonumber(ARGV[2 * p + 3])
+        if not onhand then
+            return -1
+        end
+        redis.call('SET', KEYS[3 * p + 1], onhand)
+    end
+    local held = tonumber(redis.call('GET', KEYS[3 * p + 2]) or '0')
+    if onhand - held < tonumber(ARGV[2 * p + 2]) then
+        return p + 1
+    end
+end
+for p = 0, #KEYS / 3 - 1 do
+    redis.call('INCRBY', KEYS[3 * p + 2], ARGV[2 * p + 2])
+    redis.call('SET', KEYS[3 * p + 3], 1, 'PX', ARGV[1])
+end
+return 0
+"""
+
+# KEYS = held counters, ARGV = amounts; never goes below zero
+RELEASE_LUA = """
+for i, key in ipairs(KEYS) do
+    local left = redis.call('DECRBY', key, ARGV[i])
+    if left < 0 then
+        redis.call('SET', key, 0)
+    end
+end
+return 0
+"""
+
+# compare-and-set used by reconcile_inventory, so it never clobbers a reservation
+# that happened between reading a counter and correcting it. KEYS[2], if given,
+# is the product's in-flight marker: while it is set a hold may be counted in
+# Redis but not committed in Postgres (or the reverse), so the counter is left
+# alone.
+CAS_LUA = """
+if KEYS[2] and redis.call('EXISTS', KEYS[2]) == 1 then
+    return 0
+end
+local current = redis.call('GET', KEYS[1])
+if (current or '') == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+_scripts = {}
+
+
+def _script(source):
+    if source not in _scripts:
+        _scripts[source] = get_redis_connection("default").register_script(source)
+    return _scripts[source]
+
+
+def onhand_key(product_id):
+    return f"stock:onhand:{product_id}"
+
+
+def held_key(product_id):
+    return f"stock:held:{product_id}"
+
+
+def inflight_key(product_id):
+    return f"stock:inflight:{product_id}"
+
+
+def use_redis():
+    return settings.INVENTORY_BACKEND == "redis"
+
+
+def order_quantities(orders):
+    """{product id: quantity} over the line items of the given orders (prefetch "items")."""
+    quantities, legacy = defaultdict(int), defaultdict(int)
+    for order in orders:
+        items = order.items.all()
+        for item in items:
+            if item.product_id:
+                quantities[item.product_id] += item.quantity
+        if not items:
+            # placed before OrderItem and not reached by backfill_order_items yet
+            for product_id, quantity, _item in snapshot_lines(order.metadata):
+                if product_id:
+                    legacy[product_id] += quantity
+    if legacy:
+        # the snapshot may name products deleted since
+        for product_id in Product.objects.filter(pk__in=legacy).values_list("pk", flat=True):
+            quantities[product_id] += legacy[product_id]
+    return quantities
+
+
+def _short(product_ids):
+    names = Product.objects.filter(pk__in=product_ids).values_list("name", flat=True)
+    return ValidationError({"items": f"Not enough stock for: {', '.join(names)}."})
+
+
+def _reserve_in_db(quantities):
+    """Fallback check: lock the product rows and compare with every active hold."""
+    now = timezone.now()
+    stock = dict(
+        Product.objects.select_for_update().filter(pk__in=quantities).values_list("pk", "pieces_available")
+    )
+    held = dict(
+        StockHold.objects.filter(product_id__in=quantities, expires_at__gt=now)
+        .values("product_id").annotate(total=Sum("quantity")).values_list("product_id", "total")
+    )
+    short = [pid for pid in quantities if stock.get(pid, 0) < held.get(pid, 0)]
+    if short:
+        raise _short(short)
+
+
+def _reserve_in_redis(product_ids, quantities):
+    keys = [key for pid in product_ids for key in (onhand_key(pid), held_key(pid), inflight_key(pid))]
+    ttl = settings.INVENTORY_IN_FLIGHT_TTL * 1000
+    short = _script(RESERVE_LUA)(keys=keys, args=[ttl] + [v for pid in product_ids for v in (quantities[pid], "")])
+    if short == -1:
+        # seed the missing counters from the locked rows: a take_stock() that
+        # commits meanwhile waits for us, so the seed can't be stale
+        stock = dict(
+            Product.objects.select_for_update().filter(pk__in=product_ids).order_by("pk")
+            .values_list("pk", "pieces_available")
+        )
+        args = [ttl] + [v for pid in product_ids for v in (quantities[pid], stock.get(pid, 0))]
+        short = _script(RESERVE_LUA)(keys=keys, args=args)
+    return short
+
+
+def reserve(order, quantities):
+    """
+    Hold {product id: quantity} for `order`, inside the order's transaction.
+    Raises ValidationError if anything is short.
+    """
+    product_ids = sorted(quantities)
+    StockHold.objects.bulk_create([
+        StockHold(
+            order=order, product_id=pid, quantity=quantities[pid],
+            expires_at=timezone.now() + timedelta(seconds=settings.INVENTORY_HOLD_TTL),
+        )
+        for pid in product_ids
+    ])
+    if use_redis():
+        try:
+            short = _reserve_in_redis(product_ids, quantities)
+        except RedisError as e:
+            logger.warning("inventory counters unavailable, reserving in the database: %s", e)
+        else:
+            if short:
+                raise _short([product_ids[short - 1]])
+            # counters move before the commit: keep this the last step of the
+            # transaction; the in-flight marker keeps reconcile_inventory off
+            # the counters until it has committed or rolled back
+            return
+    _reserve_in_db(quantities)
+
+
+def _release_counters(held):
+    if not held or not use_redis():
+        return
+    pids = list(held)
+    try:
+        _script(RELEASE_LUA)(keys=[held_key(pid) for pid in pids], args=[held[pid] for pid in pids])
+    except RedisError as e:
+        logger.warning("could not release held counters %s: %s", held, e)
+
+
+def _mark_in_flight(product_ids):
+    if not product_ids or not use_redis():
+        return
+    try:
+        pipe = get_redis_connection("default").pipeline(transaction=False)
+        for pid in product_ids:
+            pipe.set(inflight_key(pid), 1, px=settings.INVENTORY_IN_FLIGHT_TTL * 1000)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning("could not mark %s in flight: %s", list(product_ids), e)
+
+
+def forget_stock(product_ids):
+    """Drop the onhand mirrors; the next reservation re-seeds them from Postgres."""
+    if not product_ids or not use_redis():
+        return
+    try:
+        get_redis_connection("default").delete(*[onhand_key(pid) for pid in product_ids])
+    except RedisError as e:
+        logger.warning("could not reset stock counters for %s: %s", list(product_ids), e)
+
+
+def release_holds(holds):
+    """
+    Delete the given holds (inside a transaction) and hand their units back to
+    the counters after commit. Returns {product id: units released}.
+    """
+    rows = list(holds.select_for_update().values_list("pk", "product_id", "quantity"))
+    held = defaultdict(int)
+    for _pk, product_id, quantity in rows:
+        held[product_id] += quantity
+    if rows:
+        # the counters only drop after commit; until then reconcile_inventory
+        # would see holds gone from Postgres but still counted in Redis
+        _mark_in_flight(held)
+        StockHold.objects.filter(pk__in=[row[0] for row in rows]).delete()
+        transaction.on_commit(lambda: _release_counters(held))
+    return held
+
+
+def take_stock(quantities):
+    """
+    Decrement pieces_available for {product id: quantity} in one conditional
+    UPDATE: a row only matches while it still has enough pieces, and
+    `available` flips off when it reaches zero. Raises ValidationError (rolling
+    back the caller's transaction) if any product is short.
+    """
+    enough = Q()
+    taken, sold_out = [], []
+    for product_id, quantity in quantities.items():
+        enough |= Q(pk=product_id, pieces_available__gte=quantity)
+        taken.append(When(pk=product_id, then=Value(quantity)))
+        sold_out.append(When(pk=product_id, pieces_available=quantity, then=Value(False)))
+    updated = Product.objects.filter(enough).update(
+        pieces_available=F("pieces_available") - Case(*taken),
+        available=Case(*sold_out, default=F("available")),
+    )
+    if updated != len(quantities):
+        raise _short(Product.objects.filter(pk__in=quantities).exclude(enough).values_list("pk", flat=True))
+    _stock_changed(quantities)
+
+
+def return_stock(quantities):
+    """Put units back on the shelf (reversal of a confirmed order)."""
+    Product.objects.filter(pk__in=quantities).update(
+        pieces_available=F("pieces_available") + Case(*[When(pk=pid, then=Value(q)) for pid, q in quantities.items()]),
+        available=True,
+    )
+    _stock_changed(quantities)
+
+
+def _stock_changed(quantities):
+    # .update() skips the Product signals
+    pids = list(quantities)
+    transaction.on_commit(lambda: forget_stock(pids))
+    transaction.on_commit(lambda: caching.bump(caching.PRODUCTS, caching.RELATED))
+
+
+def commit_orders(orders):
+    """Confirmed payment: the orders' holds become real stock decrements."""
+    quantities = order_quantities(orders)
+    release_holds(StockHold.objects.filter(order__in=orders))
+    if quantities:
+        take_stock(quantities)
+
+
+def reverse_orders(orders):
+    """Reversed payment of confirmed orders: their units go back into stock."""
+    quantities = order_quantities(orders)
+    if quantities:
+        return_stock(quantities)
+
+
+def extend_holds(order, seconds):
+    return StockHold.objects.filter(order=order).update(expires_at=timezone.now() + timedelta(seconds=seconds))
+
+
+def expire_holds():
+    """Release every hold past its expiry; returns the number of units freed."""
+    with transaction.atomic():
+        held = release_holds(StockHold.objects.filter(expires_at__lte=timezone.now()))
+    return sum(held.values())
@@ -0,0 +1,72 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from products.models import Order, OrderItem, Product
+from products.utils import snapshot_lines
+
+
+def _price(value):
+    try:
+        return Decimal(str(value).replace(",", ""))
+    except (InvalidOperation, ValueError):
+        return Decimal("0")
+
+
+class Command(BaseCommand):
+    help = (
+        "Create OrderItem rows from Order.metadata[\"items\"] for orders that have none. "
+        "Streams orders with a server-side cursor and writes each chunk with bulk_create "
+        "in its own transaction; safe to stop and re-run (use --start-after to skip ahead)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--start-after", type=int, default=0, help="Only orders with a larger id.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        orders = (
+            Order.objects.filter(pk__gt=options["start_after"])
+            .filter(~Exists(OrderItem.objects.filter(order=OuterRef("pk"))))
+            .order_by("pk")
+            .values_list("pk", "metadata", "created_at")
+        )
+
+        batch, seen, created = [], 0, 0
+        for row in orders.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                created += self.write(batch)
+                seen += len(batch)
+                self.stdout.write(f"  up to order {batch[-1][0]}: {created} item(s) from {seen} order(s)")
+                batch = []
+        if batch:
+            created += self.write(batch)
+            seen += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {created} order item(s) from {seen} order(s)."))
+
+    def write(self, rows):
+        lines = [(pk, created_at, line) for pk, metadata, created_at in rows for line in snapshot_lines(metadata)]
+
+        # older snapshots may point at products that have since been deleted
+        wanted = {product_id for _, _, (product_id, _, _) in lines}
+        existing = set(Product.objects.filter(pk__in=wanted - {None}).values_list("pk", flat=True))
+
+        objs = []
+        for pk, created_at, (product_id, quantity, item) in lines:
+            objs.append(OrderItem(
+                order_id=pk,
+                product_id=product_id if product_id in existing else None,
+                name=str(item.get("name", ""))[:200],
+                unit_price=_price(item.get("price", 0)),
+                size=str(item.get("size") or "")[:10],
+                quantity=quantity,
+                created_at=created_at,
+            ))
+        with transaction.atomic():
+            OrderItem.objects.bulk_create(objs)
+        return len(objs)
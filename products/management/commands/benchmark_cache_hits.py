@@ -0,0 +1,54 @@
+import pickle
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from rest_framework.renderers import JSONRenderer
+
+from products import caching
+
+
+class Command(BaseCommand):
+    help = (
+        "Cache-hit cost for the product and category lists: the old hit path (unpickle "
+        "response.data, re-render through JSONRenderer) vs. serving the cached rendered bytes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--url", action="append", dest="urls")
+
+    def time_it(self, fn, n):
+        wall, cpu = [], []
+        for _ in range(n):
+            w, c = time.perf_counter(), time.process_time()
+            fn()
+            wall.append((time.perf_counter() - w) * 1e6)
+            cpu.append((time.process_time() - c) * 1e6)
+        return statistics.median(wall), statistics.mean(cpu)
+
+    def report(self, label, wall, cpu):
+        self.stdout.write(f"    {label:<34} median {wall:9.1f} us   cpu {cpu:9.1f} us/req")
+
+    @override_settings(SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=["localhost"])
+    def handle(self, *args, **options):
+        n = options["requests"]
+        client = Client(HTTP_HOST="localhost", HTTP_ACCEPT="application/json")
+        for url in options["urls"] or ["/api/products/products/", "/api/products/categories/"]:
+            warm = client.get(url)
+            data = warm.json()
+            self.stdout.write(f"{url}  ({len(warm.content)} bytes)")
+
+            # hit-path work only, no Redis round trip
+            old_blob = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+            new_blob = pickle.dumps(caching.render_payload(data), pickle.HIGHEST_PROTOCOL)
+            self.report("hit: unpickle data + render", *self.time_it(
+                lambda: JSONRenderer().render(pickle.loads(old_blob)), n))
+            self.report("hit: unpickle rendered bytes", *self.time_it(
+                lambda: pickle.loads(new_blob)["body"], n))
+
+            # full request through the URLconf, middleware and DRF dispatch
+            self.report("request (cached bytes)", *self.time_it(lambda: client.get(url), n))
+            self.report("request (cached bytes, gzip)", *self.time_it(
+                lambda: client.get(url, HTTP_ACCEPT_ENCODING="gzip"), n))
@@ -0,0 +1,90 @@
+import statistics
+import threading
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import override_settings
+from django_redis import get_redis_connection
+from rest_framework.exceptions import ValidationError
+
+from products import inventory
+from products.models import Order, Product, StockHold
+from products.orders import place_order
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrent checkouts against one hot product: every thread keeps placing "
+        "single-unit orders until the stock is gone. Prints throughput, latency and "
+        "how many units were oversold (should be 0)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--stock", type=int, default=500)
+        parser.add_argument("--attempts", type=int, default=1500, help="Total checkout attempts across threads.")
+        parser.add_argument("--backend", choices=["redis", "db"], default="redis",
+                            help="redis counters, or the row-locking database fallback")
+        parser.add_argument("--keep", action="store_true", help="Keep the benchmark product and orders.")
+
+    def handle(self, *args, **options):
+        user, _ = get_user_model().objects.get_or_create(username="checkout-bench", defaults={"email": "bench@example.com"})
+        product = Product.objects.create(name=f"Hot item {uuid.uuid4().hex[:6]}", price="100.00",
+                                         pieces_available=options["stock"], sizes=[])
+        lines = [{"product": product.pk, "size": "", "quantity": 1}]
+
+        remaining = [options["attempts"]]
+        lock = threading.Lock()
+        latencies, placed, rejected = [], [0], [0]
+
+        def worker():
+            while True:
+                with lock:
+                    if remaining[0] <= 0:
+                        break
+                    remaining[0] -= 1
+                started = time.perf_counter()
+                try:
+                    place_order(user, lines, uuid.uuid4().hex[:12])
+                    ok = True
+                except ValidationError:
+                    ok = False
+                took = time.perf_counter() - started
+                with lock:
+                    latencies.append(took)
+                    if ok:
+                        placed[0] += 1
+                    else:
+                        rejected[0] += 1
+            connections.close_all()
+
+        try:
+            with override_settings(INVENTORY_BACKEND=options["backend"]):
+                inventory.forget_stock([product.pk])
+                started = time.perf_counter()
+                threads = [threading.Thread(target=worker) for _ in range(options["threads"])]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+                elapsed = time.perf_counter() - started
+
+            held = sum(StockHold.objects.filter(product=product).values_list("quantity", flat=True))
+            latencies.sort()
+            self.stdout.write(f"backend={options['backend']} threads={options['threads']} stock={options['stock']}")
+            self.stdout.write(f"  attempts   {len(latencies)} in {elapsed:.2f}s ({len(latencies) / elapsed:.0f}/s)")
+            self.stdout.write(f"  placed     {placed[0]}   rejected {rejected[0]}   units held {held}")
+            self.stdout.write(f"  latency    p50 {statistics.median(latencies) * 1000:.1f} ms"
+                              f"   p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+            oversold = max(0, held - options["stock"])
+            style = self.style.SUCCESS if oversold == 0 else self.style.ERROR
+            self.stdout.write(style(f"  oversold   {oversold}"))
+        finally:
+            if not options["keep"]:
+                Order.objects.filter(holds__product=product).delete()
+                product.delete()
+                inventory.forget_stock([product.pk])
+                get_redis_connection("default").delete(inventory.held_key(product.pk))
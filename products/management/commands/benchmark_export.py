@@ -0,0 +1,116 @@
+import resource
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from products.models import Order, Sale
+from products.views import OrderExportView, SaleExportView
+
+SEED_MARK = "export-bench"
+
+
+def rss_kb():
+    """Current resident set size; falls back to the peak where /proc is missing."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed N orders or sales with one INSERT ... SELECT generate_series, then stream "
+        "them through the CSV/NDJSON export view. Prints rows/s, MB/s and peak RSS, "
+        "which should stay flat as --rows grows. Seeded sales bypass the rollups and "
+        "are removed again with raw SQL unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--kind", choices=["orders", "sales"], default="orders")
+        parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+        parser.add_argument("--chunk-size", type=int, help="Override EXPORT_CHUNK_SIZE.")
+        parser.add_argument("--keep", action="store_true", help="Keep the seeded rows.")
+
+    def handle(self, *args, **options):
+        user, _ = get_user_model().objects.get_or_create(
+            username=SEED_MARK, defaults={"email": "export-bench@example.com", "is_staff": True, "is_superuser": True}
+        )
+        kind, rows = options["kind"], options["rows"]
+
+        started = time.perf_counter()
+        self.seed(kind, rows, user)
+        self.stdout.write(f"seeded {rows} {kind} in {time.perf_counter() - started:.1f}s")
+
+        try:
+            self.export(kind, options["format"], options["chunk_size"], user)
+        finally:
+            if not options["keep"]:
+                self.cleanup(kind)
+
+    def seed(self, kind, rows, user):
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            if kind == "orders":
+                cursor.execute(
+                    f"INSERT INTO {qn(Order._meta.db_table)} "
+                    "(user_id, reference, amount, status, confirm_status, metadata, created_at) "
+                    "SELECT %s, %s || '-' || g, (g %% 50000) / 100.0 + 1, "
+                    "CASE WHEN g %% 3 = 0 THEN 'paid' ELSE 'initiated' END, "
+                    "CASE WHEN g %% 3 = 0 THEN 'confirmed' ELSE 'pending' END, "
+                    "'{}'::jsonb, now() - g * interval '1 second' "
+                    "FROM generate_series(1, %s) AS g",
+                    [user.pk, SEED_MARK, rows],
+                )
+            else:
+                cursor.execute(
+                    f"INSERT INTO {qn(Sale._meta.db_table)} "
+                    "(customer_name, amount_paid, cost_of_production, workmanship, profit_or_loss, is_profit, "
+                    "date_paid, date_completed, created_by_id, created_at) "
+                    "SELECT %s, 150, 80 + g %% 100, 20, 50 - g %% 100, g %% 100 <= 50, "
+                    "current_date - (g %% 1000), current_date - (g %% 1000), %s, now() - g * interval '1 second' "
+                    "FROM generate_series(1, %s) AS g",
+                    [SEED_MARK, user.pk, rows],
+                )
+            cursor.execute("ANALYZE " + qn((Order if kind == "orders" else Sale)._meta.db_table))
+
+    def export(self, kind, fmt, chunk_size, user):
+        view = OrderExportView if kind == "orders" else SaleExportView
+        request = APIRequestFactory().get(f"/api/products/{kind}/export/", {"format": fmt})
+        force_authenticate(request, user=user)
+
+        baseline = peak = rss_kb()
+        lines = size = chunks = 0
+        started = time.perf_counter()
+        with override_settings(EXPORT_CHUNK_SIZE=chunk_size or settings.EXPORT_CHUNK_SIZE):
+            response = view.as_view()(request)
+        for chunk in response.streaming_content:
+            chunks += 1
+            size += len(chunk)
+            lines += chunk.count(b"\n")
+            peak = max(peak, rss_kb())
+        elapsed = time.perf_counter() - started
+        response.close()
+
+        exported = lines - (1 if fmt == "csv" else 0)
+        self.stdout.write(f"kind={kind} format={fmt} status={response.status_code}")
+        self.stdout.write(f"  rows       {exported} in {elapsed:.2f}s ({exported / elapsed:,.0f} rows/s)")
+        self.stdout.write(f"  output     {size / 2**20:.1f} MB in {chunks} chunks ({size / 2**20 / elapsed:.1f} MB/s)")
+        self.stdout.write(f"  rss        start {baseline / 1024:.1f} MB, peak {peak / 1024:.1f} MB "
+                          f"(+{(peak - baseline) / 1024:.1f} MB)")
+
+    def cleanup(self, kind):
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            # raw DELETEs: no per-row signals (and the seeded sales never reached the rollups)
+            if kind == "orders":
+                cursor.execute(f"DELETE FROM {qn(Order._meta.db_table)} WHERE reference LIKE %s", [SEED_MARK + "-%"])
+            else:
+                cursor.execute(f"DELETE FROM {qn(Sale._meta.db_table)} WHERE customer_name = %s", [SEED_MARK])
+        get_user_model().objects.filter(username=SEED_MARK, orders__isnull=True, sale__isnull=True).delete()
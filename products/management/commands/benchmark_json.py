@@ -0,0 +1,61 @@
+import statistics
+import time
+import tracemalloc
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from herome_fab.renderers import ORJSONRenderer
+from products.models import EMBEDDED_REVIEWS_LIMIT, Order, Product
+from products.serializers import OrderSerializer, ProductSerializer
+
+
+class Command(BaseCommand):
+    help = "Encode time and allocations of DRF's JSONRenderer vs ORJSONRenderer on ProductSerializer / OrderSerializer payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100, help="Objects per payload.")
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def order_payload(self, rows):
+        orders = list(Order.objects.select_related("user").order_by("-id")[:rows])
+        if len(orders) < rows:
+            # not enough real orders: pad with unsaved ones shaped like checkout snapshots
+            user = get_user_model()(id=1, username="bench", email="bench@example.com")
+            for i in range(rows - len(orders)):
+                orders.append(Order(
+                    id=i, user=user, reference=uuid.uuid4().hex[:12], amount=Decimal("45500.00"),
+                    metadata={"items": [{"id": n, "name": f"Item {n}", "price": "15166.67", "size": "M", "qty": 1} for n in range(3)]},
+                    created_at=timezone.now(),
+                ))
+        return OrderSerializer(orders, many=True).data
+
+    def measure(self, renderer, data, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            renderer.render(data)
+            timings.append((time.perf_counter() - started) * 1e6)
+        tracemalloc.start()
+        renderer.render(data)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return statistics.median(timings), peak
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        products = Product.objects.filter(is_active=True).for_display(EMBEDDED_REVIEWS_LIMIT)[:rows]
+        payloads = {
+            "ProductSerializer": ProductSerializer(products, many=True).data,
+            "OrderSerializer": self.order_payload(rows),
+        }
+        for name, data in payloads.items():
+            size = len(JSONRenderer().render(data))
+            self.stdout.write(f"{name} x{len(data)} ({size} bytes)")
+            for label, renderer in (("json (DRF)", JSONRenderer()), ("orjson", ORJSONRenderer())):
+                median, peak = self.measure(renderer, data, repeat)
+                self.stdout.write(f"    {label:<11} median {median:9.1f} us   peak alloc {peak / 1024:8.1f} KiB")
@@ -0,0 +1,49 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from products.models import Product
+
+PAGE_SIZE = 12
+
+
+class Command(BaseCommand):
+    help = "Compare the old ILIKE product search with the full-text search_vector path (run seed_catalog first)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("terms", nargs="*", default=["gown", "red kaftan", "embroidered", "wedding lace"])
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--explain", action="store_true", help="Print the query plan for each path.")
+
+    def handle(self, *args, **options):
+        base = Product.objects.filter(is_active=True)
+        paths = {
+            "icontains": lambda term: base.filter(name__icontains=term).order_by("-id"),
+            "fulltext": lambda term: base.search(term),
+        }
+        self.stdout.write(f"catalog size: {base.count()}")
+
+        for term in options["terms"]:
+            for label, build in paths.items():
+                timings = []
+                for _ in range(options["repeat"]):
+                    qs = build(term)
+                    started = time.perf_counter()
+                    # what a list request costs: COUNT for the paginator + the first page
+                    total = qs.count()
+                    list(qs[:PAGE_SIZE])
+                    timings.append((time.perf_counter() - started) * 1000)
+                timings.sort()
+                p95 = timings[int(len(timings) * 0.95) - 1]
+                self.stdout.write(
+                    f"{term!r:>18} {label:>10}: {total:>7} hits  "
+                    f"median {statistics.median(timings):7.2f} ms  p95 {p95:7.2f} ms"
+                )
+                if options["explain"]:
+                    sql, params = build(term)[:PAGE_SIZE].query.sql_with_params()
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"EXPLAIN ANALYZE {sql}", params)
+                        for (line,) in cursor.fetchall():
+                            self.stdout.write(f"      {line}")
@@ -0,0 +1,80 @@
+import csv
+from itertools import islice
+from pathlib import Path
+
+import orjson
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from products.imports import apply_import, plan_import
+
+
+def read_rows(path, fmt):
+    if fmt == "json":
+        data = orjson.loads(Path(path).read_bytes())
+        rows = data.get("products") if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise CommandError('JSON must be a list of products or {"products": [...]}.')
+        yield from rows
+        return
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            # empty cells mean "not given", as in the API's CSVParser
+            yield {key.strip(): value for key, value in row.items() if key and value not in (None, "")}
+
+
+class Command(BaseCommand):
+    help = (
+        "Create/update products from a JSON or CSV file, in batches: each batch is "
+        "validated as a whole and written with bulk_create/bulk_update in its own "
+        "transaction, with one cache invalidation per batch. Rows that name an "
+        "existing product by id or slug update it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["json", "csv"], help="Defaults to the file extension.")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--dry-run", action="store_true", help="Validate every batch without writing.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or Path(path).suffix.lstrip(".").lower()
+        if fmt not in ("json", "csv"):
+            raise CommandError("Can't tell the format from the file name; pass --format json|csv.")
+
+        rows = read_rows(path, fmt)
+        start = created = updated = 0
+        while True:
+            batch = list(islice(rows, options["batch_size"]))
+            if not batch:
+                break
+            try:
+                plan = plan_import(batch)
+                if options["dry_run"]:
+                    new, changed = plan.creates, plan.updates
+                else:
+                    new, changed = apply_import(plan)
+            except ValidationError as e:
+                for line in self.describe(e.detail, start):
+                    self.stderr.write(line)
+                raise CommandError(
+                    f"Batch starting at row {start + 1} is invalid; {created} created and "
+                    f"{updated} updated before it{' (dry run)' if options['dry_run'] else ''}."
+                )
+            created += len(new)
+            updated += len(changed)
+            start += len(batch)
+            self.stdout.write(f"  {start} row(s): {created} created, {updated} updated")
+
+        verb = "Would import" if options["dry_run"] else "Imported"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {start} row(s): {created} created, {updated} updated."))
+
+    def describe(self, detail, start):
+        rows = detail.get("rows") if isinstance(detail, dict) else None
+        if not isinstance(rows, dict):
+            yield str(detail)
+            return
+        for i, errors in rows.items():
+            messages = "; ".join(f"{field}: {' '.join(map(str, msgs))}" for field, msgs in errors.items())
+            yield f"row {start + int(i) + 1}: {messages}"
@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import Counter
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client, override_settings
+
+from products import caching
+
+
+def naive_read_through(key, compute, timeout, beta=1.0):
+    """The pre-read_through pattern: get, and on a miss every worker recomputes."""
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer hot catalog endpoints from many threads with a very short cache TTL and "
+        "print database queries per second, to show expiries don't turn into query spikes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--seconds", type=int, default=12)
+        parser.add_argument("--ttl", type=int, default=3, help="Soft TTL used for the run.")
+        parser.add_argument("--naive", action="store_true", help="Use plain get/set for comparison.")
+        parser.add_argument("--url", action="append", dest="urls")
+
+    def handle(self, *args, **options):
+        urls = options["urls"] or ["/api/products/products/", "/api/products/categories/"]
+        per_second = Counter()
+        lock = threading.Lock()
+        stop = time.time() + options["seconds"]
+        started = time.time()
+
+        def count_query(execute, sql, params, many, context):
+            with lock:
+                per_second[int(time.time() - started)] += 1
+            return execute(sql, params, many, context)
+
+        def worker():
+            client = Client()
+            with connection.execute_wrapper(count_query):
+                while time.time() < stop:
+                    for url in urls:
+                        client.get(url, HTTP_HOST="localhost")
+            connections.close_all()
+
+        patch = mock.patch.object(caching, "read_through", naive_read_through) if options["naive"] else mock.MagicMock()
+        with patch, override_settings(CATALOG_CACHE_TIMEOUT=options["ttl"], CACHE_STALE_GRACE=options["ttl"] * 4,
+                                      SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=["localhost"]):
+            threads = [threading.Thread(target=worker) for _ in range(options["threads"])]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        mode = "naive get/set" if options["naive"] else "read_through"
+        self.stdout.write(f"{mode}: {options['threads']} threads, soft TTL {options['ttl']}s")
+        for second in range(options["seconds"]):
+            count = per_second.get(second, 0)
+            self.stdout.write(f"  t={second:>3}s  {count:>5} queries  {'#' * min(count, 80)}")
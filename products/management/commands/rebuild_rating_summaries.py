@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from products.models import Product, Review, RATING_SUMMARY_FIELDS
+
+
+class Command(BaseCommand):
+    help = "Recompute every product's rating summary (count, sum, 1-5 histogram) from the Review table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        histogram = {
+            f"rating_{star}_count": Count("id", filter=Q(rating=star)) for star in range(1, 6)
+        }
+        stats = (
+            Review.objects.order_by()
+            .values("product_id")
+            .annotate(review_count=Count("id"), rating_sum=Sum("rating"), **histogram)
+        )
+
+        with transaction.atomic():
+            # lock out concurrent F() updates while the summaries are rewritten
+            list(Product.objects.select_for_update().values_list("pk", flat=True))
+            Product.objects.update(**{field: 0 for field in RATING_SUMMARY_FIELDS})
+
+            batch = []
+            updated = 0
+            for row in stats.iterator(chunk_size=batch_size):
+                product = Product(pk=row.pop("product_id"))
+                for field, value in row.items():
+                    setattr(product, field, value)
+                batch.append(product)
+                if len(batch) >= batch_size:
+                    Product.objects.bulk_update(batch, RATING_SUMMARY_FIELDS)
+                    updated += len(batch)
+                    batch = []
+            if batch:
+                Product.objects.bulk_update(batch, RATING_SUMMARY_FIELDS)
+                updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating summaries for {updated} reviewed products."))
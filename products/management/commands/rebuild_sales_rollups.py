@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from products.models import SALES_ROLLUP_FIELDS, Sale, SalesRollup
+from products.reports import rollup_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily and monthly SalesRollup rows from the Sale table. Needed "
+        "after bulk .update()/.bulk_create() on Sale, which bypass the incremental upkeep."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Report periods that drifted without rewriting them.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        with transaction.atomic():
+            # hold off Sale writes (reads go on) so no adjustment lands between the
+            # aggregate and the rewrite
+            with connection.cursor() as cursor:
+                cursor.execute(f"LOCK TABLE {connection.ops.quote_name(Sale._meta.db_table)} IN SHARE MODE")
+
+            fresh = []
+            for granularity in ("day", "month"):
+                for row in rollup_stats(granularity).iterator(chunk_size=batch_size):
+                    fresh.append(SalesRollup(granularity=granularity, **row))
+
+            stored = {
+                (row["granularity"], row["period"]): tuple(row[field] for field in SALES_ROLLUP_FIELDS)
+                for row in SalesRollup.objects.filter(sales__gt=0).values("granularity", "period", *SALES_ROLLUP_FIELDS)
+            }
+            expected = {
+                (row.granularity, row.period): tuple(getattr(row, field) for field in SALES_ROLLUP_FIELDS)
+                for row in fresh
+            }
+            drifted = sum(1 for key in stored.keys() | expected.keys() if stored.get(key) != expected.get(key))
+
+            if options["dry_run"]:
+                self.stdout.write(f"{drifted} of {len(expected)} rollup row(s) out of date.")
+                return
+            SalesRollup.objects.all().delete()
+            SalesRollup.objects.bulk_create(fresh, batch_size=batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {len(fresh)} sales rollup row(s); {drifted} had drifted."
+        ))
@@ -0,0 +1,78 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django_redis import get_redis_connection
+
+from products import inventory
+from products.models import Product, StockHold
+
+
+class Command(BaseCommand):
+    help = (
+        "Release expired stock holds and repair drift between the Redis reservation "
+        "counters and Postgres (StockHold rows and Product.pieces_available). Runs as "
+        "the Procfile clock with --every; run it by hand after a Redis outage."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--every", type=float, help="Keep running, reconciling every N seconds.")
+        parser.add_argument("--dry-run", action="store_true", help="Report drift without fixing it.")
+
+    def handle(self, *args, **options):
+        while True:
+            self.reconcile(options["batch_size"], options["dry_run"])
+            if not options["every"]:
+                break
+            time.sleep(options["every"])
+
+    def reconcile(self, batch_size, dry_run):
+        freed = 0 if dry_run else inventory.expire_holds()
+        if not inventory.use_redis():
+            self.stdout.write(f"Released {freed} expired unit(s); INVENTORY_BACKEND is not redis.")
+            return
+
+        redis = get_redis_connection("default")
+        cas = redis.register_script(inventory.CAS_LUA)
+        checked = fixed = busy = 0
+        last_pk = 0
+        while True:
+            rows = list(
+                Product.objects.filter(pk__gt=last_pk).order_by("pk").values_list("pk", "pieces_available")[:batch_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            pids = [pk for pk, _ in rows]
+            # counters first, then the holds, so a hold committed in between is counted
+            keys = [key for pid in pids for key in (inventory.onhand_key(pid), inventory.held_key(pid))]
+            values = redis.mget(keys)
+            held = dict(
+                StockHold.objects.filter(product_id__in=pids).order_by()
+                .values("product_id").annotate(total=Sum("quantity")).values_list("product_id", "total")
+            )
+            for i, (pid, pieces) in enumerate(rows):
+                onhand, held_now = values[2 * i], values[2 * i + 1]
+                checked += 1
+                expected = {
+                    # a missing onhand counter is fine: it is seeded on the next checkout
+                    inventory.onhand_key(pid): (onhand, pieces if onhand is not None else None, []),
+                    # skipped while a reservation or release is in flight
+                    inventory.held_key(pid): (held_now, held.get(pid, 0), [inventory.inflight_key(pid)]),
+                }
+                for key, (current, want, guard) in expected.items():
+                    if want is None or int(current or 0) == want:
+                        continue
+                    self.stdout.write(f"{key}: redis {int(current or 0)}, postgres {want}")
+                    if dry_run:
+                        continue
+                    if cas(keys=[key, *guard], args=[(current or b"").decode(), want]):
+                        fixed += 1
+                    else:
+                        busy += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Released {freed} expired unit(s); checked {checked} product(s), fixed {fixed} counter(s), "
+            f"left {busy} in flight."
+        ))
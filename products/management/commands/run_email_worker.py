@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from products.emails import send_due
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued mail from the EmailOutbox in batches over one persistent "
+        "connection to EMAIL_BACKEND, retrying failures with backoff."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.EMAIL_OUTBOX_BATCH_SIZE)
+        parser.add_argument("--poll-interval", type=float, default=settings.EMAIL_WORKER_POLL_INTERVAL,
+                            help="Seconds to sleep when the outbox is empty.")
+        parser.add_argument("--once", action="store_true", help="Drain what is due now, then exit.")
+        parser.add_argument("--backend", help="Dotted path of a mail backend to use instead of EMAIL_BACKEND, "
+                                 "e.g. django.core.mail.backends.console.EmailBackend.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        connection = get_connection(options["backend"])
+        sent = failed = 0
+        try:
+            while True:
+                batch = send_due(connection, batch_size)
+                for row in batch:
+                    if row.status == "sent":
+                        sent += 1
+                    else:
+                        failed += 1
+                        self.stderr.write(f"#{row.pk} {row.status} after {row.attempts} attempt(s): {row.last_error}")
+                if len(batch) < batch_size:
+                    # caught up: don't hold the SMTP session open while idle
+                    connection.close()
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} message(s), {failed} failed."))
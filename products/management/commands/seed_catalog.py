@@ -0,0 +1,53 @@
+import random
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils.text import slugify
+
+from products.models import Category, Product
+
+CATEGORIES = ["Gowns", "Ankara", "Agbada", "Kaftans", "Aso Oke", "Lace", "Shirts", "Trousers", "Kids Wear", "Accessories"]
+COLORS = ["red", "black", "white", "gold", "green", "blue", "purple", "orange", "cream", "wine"]
+ADJECTIVES = ["classic", "royal", "embroidered", "silk", "beaded", "floral", "slim fit", "flowing", "vintage", "premium"]
+NOUNS = ["gown", "kaftan", "agbada", "buba", "wrapper", "shirt", "trouser", "jumpsuit", "dress", "cap"]
+WORDS = ["handmade", "tailored", "breathable", "wedding", "owambe", "party", "casual", "cotton", "linen", "lagos"]
+
+
+class Command(BaseCommand):
+    help = "Seed a synthetic catalog (for benchmarks / local load tests). Never run against production."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100_000)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        categories = [Category.objects.get_or_create(name=name)[0] for name in CATEGORIES]
+        start = Product.objects.count()
+        total = options["products"]
+        batch_size = options["batch_size"]
+
+        created = 0
+        while created < total:
+            batch = []
+            for i in range(created, min(created + batch_size, total)):
+                name = f"{rng.choice(ADJECTIVES)} {rng.choice(COLORS)} {rng.choice(NOUNS)}".title()
+                batch.append(Product(
+                    name=name,
+                    slug=f"{slugify(name)}-seed-{start + i}",
+                    description=" ".join(rng.choices(WORDS, k=12)),
+                    price=Decimal(rng.randrange(5_000, 250_000)) / 100,
+                    category=rng.choice(categories),
+                    gender=rng.choice(["male", "female", "unisex", "kids"]),
+                    color=rng.choice(COLORS),
+                    pieces_available=rng.randrange(0, 50),
+                    sizes=rng.sample(["XS", "S", "M", "L", "XL", "XXL"], k=rng.randrange(1, 5)),
+                ))
+            # bulk_create skips Product.save, so build the search documents per batch
+            new = Product.objects.bulk_create(batch)
+            Product.objects.filter(pk__in=[p.pk for p in new]).update_search_vector()
+            created += len(batch)
+            self.stdout.write(f"  {created}/{total}")
+
+        self.stdout.write(self.style.SUCCESS(f"Seeded {created} products."))
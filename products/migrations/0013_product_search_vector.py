@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:14
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import Value
+
+
+def backfill_search_vector(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    groups = Product.objects.order_by().values_list('category_id', 'category__name').distinct()
+    for category_id, category_name in groups:
+        Product.objects.filter(category_id=category_id).update(
+            search_vector=(
+                SearchVector('name', weight='A', config='english')
+                + SearchVector('color', weight='B', config='english')
+                + SearchVector(Value(category_name or ''), weight='B', config='english')
+                + SearchVector('description', weight='C', config='english')
+            )
+        )
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_product_rating_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0018_stock_holds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('size', models.CharField(blank=True, max_length=10)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='products.order')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_items', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', '-created_at'], name='orderitem_product_created_idx'), models.Index(fields=['-created_at'], name='orderitem_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:57
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Sum, Value
+from django.db.models.functions import Greatest, TruncMonth
+
+
+def backfill_sales_rollups(apps, schema_editor):
+    Sale = apps.get_model('products', 'Sale')
+    SalesRollup = apps.get_model('products', 'SalesRollup')
+    money = DecimalField(max_digits=14, decimal_places=2)
+    difference = F('amount_paid') - F('cost_of_production') - F('workmanship')
+    # profit/loss first: the sums below reuse the column names as aliases
+    totals = dict(
+        profit=Sum(Greatest(difference, Value(0), output_field=money)),
+        loss=Sum(Greatest(-difference, Value(0), output_field=money)),
+        sales=Count('id'),
+        revenue=Sum('amount_paid'),
+        cost_of_production=Sum('cost_of_production'),
+        workmanship=Sum('workmanship'),
+    )
+    for granularity, period in (('day', F('date_paid')), ('month', TruncMonth('date_paid'))):
+        stats = Sale.objects.order_by().annotate(period=period).values('period').annotate(**totals)
+        SalesRollup.objects.bulk_create(
+            [SalesRollup(granularity=granularity, **row) for row in stats.iterator()], batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0020_order_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('period', models.DateField()),
+                ('sales', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cost_of_production', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('workmanship', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('profit', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('loss', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('granularity', 'period'), name='salesrollup_period_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_sales_rollups, migrations.RunPython.noop),
+    ]
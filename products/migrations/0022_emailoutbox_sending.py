@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0021_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='emailoutbox',
+            name='emailoutbox_due_idx',
+        ),
+        migrations.AlterField(
+            model_name='emailoutbox',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('dead', 'Dead')], default='pending', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='emailoutbox',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'sending'])), fields=['next_attempt_at', 'id'], name='emailoutbox_due_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from datetime import datetime, time
+
+from django.db import migrations
+from django.db.models import Count
+from django.utils import timezone
+
+
+def backfill_sale_created_at(apps, schema_editor):
+    # 0016 stamped every sale that already existed with the one migration
+    # time; sales saved since have their own. Give those rows the start of
+    # their date_paid instead, so (created_at, id) orders them by date and
+    # created_at filters place them in the right period.
+    Sale = apps.get_model('products', 'Sale')
+    stamp = (
+        Sale.objects.order_by().values('created_at').annotate(n=Count('id')).filter(n__gt=1)
+        .order_by('-n').values_list('created_at', flat=True).first()
+    )
+    if stamp is None:
+        return
+    tz = timezone.get_default_timezone()
+    batch = []
+    for sale in Sale.objects.filter(created_at=stamp).only('id', 'date_paid').iterator(chunk_size=2000):
+        sale.created_at = timezone.make_aware(datetime.combine(sale.date_paid, time.min), tz)
+        batch.append(sale)
+        if len(batch) >= 2000:
+            Sale.objects.bulk_update(batch, ['created_at'])
+            batch = []
+    Sale.objects.bulk_update(batch, ['created_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0022_emailoutbox_sending'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_sale_created_at, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,18 @@
-from django.db import models
+import json
+
+from django.core.exceptions import EmptyResultSet
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Case, F, FloatField, Prefetch, Value, When
+from django.db.models.functions import Cast
 from django.conf import settings
+from django.utils import timezone
 from django.utils.text import slugify
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, SearchVectorField, TrigramWordSimilarity
 from django.core.validators import MinValueValidator, MaxValueValidator
-from .utils import generate_unique_slug
+from .utils import SLUG_ATTEMPTS, generate_unique_slug
 from cloudinary_storage.storage import MediaCloudinaryStorage
 
 
@@ -11,6 +20,17 @@ from django.contrib.auth import get_user_model
 
 User = settings.AUTH_USER_MODEL
 
+# Max reviews embedded in a product payload; the rest are served by ProductReviewsView.
+EMBEDDED_REVIEWS_LIMIT = 5
+
+# Denormalised rating counters on Product. They only move through
+# ProductQuerySet.adjust_rating_summary (F() updates) or rebuild_rating_summaries.
+RATING_HISTOGRAM_FIELDS = tuple(f"rating_{star}_count" for star in range(1, 6))
+RATING_SUMMARY_FIELDS = ("review_count", "rating_sum") + RATING_HISTOGRAM_FIELDS
+
+# Text search configuration used for Product.search_vector and ?search= queries.
+SEARCH_CONFIG = "english"
+
 GENDER_CHOICES = (
     ("male", "Male"),
     ("female", "Female"),
@@ -26,9 +46,70 @@ class Category(models.Model):
         if not self.slug:
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
+        # the category name is part of every product's search document
+        self.products.update_search_vector()
 
     def __str__(self): return self.name
 
+def product_search_vector(category_name):
+    """Weighted search document: name > color / category > description."""
+    return (
+        SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("color", weight="B", config=SEARCH_CONFIG)
+        + SearchVector(Value(category_name or ""), weight="B", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+    )
+
+
+class ProductQuerySet(models.QuerySet):
+    def update_search_vector(self):
+        """Rebuild search_vector for these products, one UPDATE per category."""
+        groups = self.order_by().values_list("category_id", "category__name").distinct()
+        for category_id, category_name in groups:
+            self.filter(category_id=category_id).update(search_vector=product_search_vector(category_name))
+
+    def search(self, text):
+        """Full-text match on search_vector (GIN index), best matches first."""
+        query = SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+        return (
+            self.filter(search_vector=query)
+            .annotate(rank=SearchRank(F("search_vector"), query))
+            .order_by("-rank", "-id")
+        )
+
+    def suggest_names(self, fragment, limit):
+        """Distinct product names closest to a typed prefix / misspelling (pg_trgm GIN index)."""
+        return (
+            self.filter(name__trigram_word_similar=fragment)
+            .values("name")
+            .annotate(similarity=TrigramWordSimilarity(fragment, "name"))
+            .distinct()
+            .order_by("-similarity", "name")[:limit]
+        )
+
+    def adjust_rating_summary(self, rating, delta=1):
+        """Add (delta=1) or remove (delta=-1) one rating from the stored summary."""
+        return self.update(**{
+            "review_count": F("review_count") + delta,
+            "rating_sum": F("rating_sum") + rating * delta,
+            f"rating_{rating}_count": F(f"rating_{rating}_count") + delta,
+        })
+
+    def with_reviews(self, limit=None):
+        """
+        Prefetch reviews (newest first) with their users into
+        Product.prefetched_reviews, which the latest_reviews property serves.
+        """
+        reviews = Review.objects.select_related("user")
+        if limit:
+            reviews = reviews[:limit]
+        return self.prefetch_related(Prefetch("reviews", queryset=reviews, to_attr="prefetched_reviews"))
+
+    def for_display(self, reviews_limit=None):
+        """Everything ProductSerializer reads, in a fixed number of queries."""
+        return self.select_related("category").with_reviews(reviews_limit)
+
+
 # models.py
 class Product(models.Model):
     name = models.CharField(max_length=200)
@@ -53,10 +134,73 @@ class Product(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
 
+    # rating summary, see RATING_SUMMARY_FIELDS
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+    avg_rating = models.GeneratedField(
+        expression=Case(
+            When(review_count=0, then=Value(0.0)),
+            default=Cast("rating_sum", FloatField()) / Cast("review_count", FloatField()),
+        ),
+        output_field=FloatField(),
+        db_persist=True,
+    )
+
+    # maintained by save() / ProductQuerySet.update_search_vector
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-avg_rating", "id"], name="product_avg_rating_idx"),
+            GinIndex(fields=["search_vector"], name="product_search_vector_idx"),
+            GinIndex(fields=["name"], opclasses=["gin_trgm_ops"], name="product_name_trgm_idx"),
+            # catalog facets (products.filters.ProductFacets)
+            GinIndex(fields=["sizes"], name="product_sizes_idx"),
+            models.Index(fields=["is_active", "gender", "price"], name="product_gender_price_idx"),
+            models.Index(fields=["is_active", "color", "price"], name="product_color_price_idx"),
+            models.Index(fields=["is_active", "price"], name="product_price_idx"),
+            # KeysetPagination
+            models.Index(fields=["is_active", "-created_at", "-id"], name="product_created_idx"),
+        ]
+
+    @property
+    def rating_histogram(self):
+        return {star: getattr(self, f"rating_{star}_count") for star in range(1, 6)}
+
+    @property
+    def latest_reviews(self):
+        if hasattr(self, "prefetched_reviews"):
+            return self.prefetched_reviews
+        return self.reviews.select_related("user")[:EMBEDDED_REVIEWS_LIMIT]
+
     def save(self, *args, **kwargs):
-        if not self.slug:
+        allocated = not self.slug
+        if allocated:
             self.slug = generate_unique_slug(Product, self.name)
-        super().save(*args, **kwargs)
+        # a stale instance must never write back the rating counters
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and not f.generated and f.name not in RATING_SUMMARY_FIELDS
+            ]
+        for attempt in range(SLUG_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                break
+            except IntegrityError:
+                # another worker took the slug after we picked it
+                if not allocated or attempt == SLUG_ATTEMPTS - 1:
+                    raise
+                self.slug = generate_unique_slug(Product, self.name)
+        Product.objects.filter(pk=self.pk).update_search_vector()
 
     def __str__(self):
         return self.name
@@ -72,9 +216,51 @@ class Review(models.Model):
     class Meta:
         unique_together = ("product","user")
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(fields=["product", "-created_at", "-id"], name="review_product_created_idx"),
+            models.Index(fields=["-created_at", "-id"], name="review_created_idx"),
+        ]
 
     def __str__(self): return f"{self.user} - {self.product} - {self.rating}"
 
+# Order state machine: transition -> (state it must be in, columns it sets).
+# Each transition is one guarded UPDATE, see OrderQuerySet.transition.
+ORDER_TRANSITIONS = {
+    # customer says they've paid: only a flag in metadata
+    "mark_paid": ({"status": "initiated", "confirm_status": "pending"}, {}),
+    "confirm": ({"confirm_status": "pending"}, {"status": "paid", "confirm_status": "confirmed"}),
+    "reverse": ({"confirm_status": "confirmed"}, {"status": "initiated", "confirm_status": "pending"}),
+}
+
+
+class OrderQuerySet(models.QuerySet):
+    def transition(self, name, metadata=None):
+        """
+        Apply transition `name` to the orders in this queryset that are still in
+        its source state, as a single UPDATE ... WHERE <state> RETURNING. A
+        concurrent transition can't slip in between the check and the write.
+        `metadata` is merged into the JSON column. Returns the updated orders.
+        """
+        source, target = ORDER_TRANSITIONS[name]
+        qn = connection.ops.quote_name
+        opts = self.model._meta
+        assignments = [f"{qn(column)} = %s" for column in target]
+        params = list(target.values())
+        if metadata:
+            assignments.append(f"{qn('metadata')} = {qn('metadata')} || %s::jsonb")
+            params.append(json.dumps(metadata, cls=DjangoJSONEncoder))
+        try:
+            ids_sql, ids_params = self.order_by().values("pk").query.sql_with_params()
+        except EmptyResultSet:
+            return []
+        guard = " AND ".join(f"{qn(column)} = %s" for column in source)
+        sql = (
+            f"UPDATE {qn(opts.db_table)} SET {', '.join(assignments)} "
+            f"WHERE {qn(opts.pk.column)} IN ({ids_sql}) AND {guard} RETURNING *"
+        )
+        return list(self.model.objects.raw(sql, params + list(ids_params) + list(source.values())))
+
+
 class Order(models.Model):
     STATUS_CHOICES = (("initiated","Initiated"),("paid","Paid"),("failed","Failed"))
     user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name="orders", on_delete=models.CASCADE)
@@ -90,9 +276,60 @@ class Order(models.Model):
     metadata = models.JSONField(default=dict)  # snapshot of items
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-created_at", "-id"], name="order_user_created_idx"),
+            models.Index(fields=["-created_at", "-id"], name="order_created_idx"),
+            models.Index(fields=["confirm_status", "-created_at", "-id"], name="order_confirm_created_idx"),
+            models.Index(fields=["status", "-created_at", "-id"], name="order_status_created_idx"),
+            # ?reference= prefix search (LIKE 'abc%') regardless of the database collation
+            models.Index(fields=["reference"], name="order_reference_prefix_idx", opclasses=["varchar_pattern_ops"]),
+        ]
+
     def __str__(self): return f"Order {self.reference} by {self.user}"
 
 
+class OrderItem(models.Model):
+    """One line of an order, snapshotted at checkout (name and price as sold)."""
+    order = models.ForeignKey(Order, related_name="items", on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name="order_items", on_delete=models.SET_NULL, null=True, blank=True)
+    name = models.CharField(max_length=200)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    size = models.CharField(max_length=10, blank=True)
+    quantity = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(default=timezone.now)  # the order's, for date-range reports
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["product", "-created_at"], name="orderitem_product_created_idx"),
+            models.Index(fields=["-created_at"], name="orderitem_created_idx"),
+        ]
+
+    def __str__(self): return f"{self.quantity} x {self.name} ({self.order_id})"
+
+
+class StockHold(models.Model):
+    """
+    Stock reserved for an initiated order until it is confirmed (the hold becomes
+    a pieces_available decrement), reversed or expires. See products.inventory.
+    """
+    order = models.ForeignKey(Order, related_name="holds", on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name="holds", on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["product", "expires_at"], name="stockhold_product_idx"),
+            models.Index(fields=["expires_at"], name="stockhold_expires_idx"),
+        ]
+
+    def __str__(self): return f"{self.quantity} x {self.product_id} for order {self.order_id}"
+
+
 # productapp/models.py (or salesapp/models.py)
 
 
@@ -108,14 +345,136 @@ class Sale(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     profit_or_loss = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     is_profit = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="sale_created_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         total_cost = self.cost_of_production + self.workmanship
         difference = self.amount_paid - total_cost
         self.profit_or_loss = difference
         self.is_profit = difference >= 0
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            # an edit moves the old figures out of the rollups and the new ones in
+            old = None
+            if not self._state.adding and self.pk:
+                old = Sale.objects.select_for_update().only(*SALE_ROLLUP_SOURCE_FIELDS).filter(pk=self.pk).first()
+            super().save(*args, **kwargs)
+            SalesRollup.objects.adjust(added=[self], removed=[old] if old else [])
 
     def __str__(self):
         return f"{self.customer_name} - {'Profit' if self.is_profit else 'Loss'}"
 
+
+# Sale fields that feed the rollups, and the running totals kept per period.
+SALE_ROLLUP_SOURCE_FIELDS = ("date_paid", "amount_paid", "cost_of_production", "workmanship")
+SALES_ROLLUP_FIELDS = ("sales", "revenue", "cost_of_production", "workmanship", "profit", "loss")
+
+
+def sale_rollup_deltas(sale, sign=1):
+    """{(granularity, period): (sales, revenue, ...)} that one sale adds (sign=-1: removes)."""
+    difference = sale.amount_paid - sale.cost_of_production - sale.workmanship
+    values = (
+        sign, sign * sale.amount_paid, sign * sale.cost_of_production, sign * sale.workmanship,
+        sign * max(difference, 0), sign * max(-difference, 0),
+    )
+    return {
+        ("day", sale.date_paid): values,
+        ("month", sale.date_paid.replace(day=1)): values,
+    }
+
+
+class SalesRollupQuerySet(models.QuerySet):
+    def adjust(self, added=(), removed=()):
+        """
+        Add the sales in `added` to their day and month rows and take the ones
+        in `removed` out, in one INSERT ... ON CONFLICT DO UPDATE that
+        increments the stored totals (rows are created on first use).
+        """
+        totals = {}
+        for sales, sign in ((added, 1), (removed, -1)):
+            for sale in sales:
+                for key, values in sale_rollup_deltas(sale, sign).items():
+                    current = totals.get(key, (0,) * len(values))
+                    totals[key] = tuple(a + b for a, b in zip(current, values))
+        rows = [(key, values) for key, values in sorted(totals.items()) if any(values)]
+        if not rows:
+            return 0
+
+        qn = connection.ops.quote_name
+        table = qn(self.model._meta.db_table)
+        columns = ("granularity", "period") + SALES_ROLLUP_FIELDS
+        placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        params = [param for (granularity, period), values in rows for param in (granularity, period, *values)]
+        sql = (
+            f"INSERT INTO {table} ({', '.join(qn(c) for c in columns)}) "
+            f"VALUES {', '.join([placeholders] * len(rows))} "
+            f"ON CONFLICT ({qn('granularity')}, {qn('period')}) DO UPDATE SET "
+            + ", ".join(f"{qn(c)} = {table}.{qn(c)} + EXCLUDED.{qn(c)}" for c in SALES_ROLLUP_FIELDS)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+        return len(rows)
+
+
+class SalesRollup(models.Model):
+    """
+    Sale totals per day and per calendar month of date_paid, so reports read a
+    handful of rows instead of the ledger. Kept in step by Sale.save and the
+    post_delete signal; rebuild_sales_rollups recomputes them (needed after
+    bulk .update()/.bulk_create() on Sale, which bypass both).
+    """
+    GRANULARITY_CHOICES = (("day", "Day"), ("month", "Month"))
+    granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES)
+    period = models.DateField()  # the day, or the first of the month
+    sales = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cost_of_production = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    workmanship = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    profit = models.DecimalField(max_digits=14, decimal_places=2, default=0)  # sum over profitable sales
+    loss = models.DecimalField(max_digits=14, decimal_places=2, default=0)  # shortfall of losing sales, positive
+
+    objects = SalesRollupQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["granularity", "period"], name="salesrollup_period_uniq"),
+        ]
+
+    def __str__(self): return f"{self.granularity} {self.period}"
+
+
+
+class EmailOutbox(models.Model):
+    """
+    Outgoing mail, written in the same transaction as the change that triggers it
+    and delivered by `manage.py run_email_worker` (see products.emails).
+    """
+    # "sending": claimed by a worker until next_attempt_at (its lease)
+    STATUS_CHOICES = (("pending", "Pending"), ("sending", "Sending"), ("sent", "Sent"), ("dead", "Dead"))
+    to = ArrayField(models.CharField(max_length=254))
+    from_email = models.CharField(max_length=254)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # the worker only ever scans due rows: pending, or claimed with an expired lease
+            models.Index(
+                fields=["next_attempt_at", "id"],
+                condition=models.Q(status__in=["pending", "sending"]),
+                name="emailoutbox_due_idx",
+            ),
+        ]
+
+    def __str__(self): return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
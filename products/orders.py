@@ -0,0 +1,97 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from rest_framework.exceptions import ValidationError
+
+from . import inventory
+from .emails import order_email_context, queue_kind_emails
+from .models import Order, OrderItem, Product
+
+
+def price_lines(lines):
+    """
+    Price [{"product", "size", "quantity"}, ...] from one bulk Product fetch.
+    Returns (total, item snapshots, {product id: quantity}).
+    """
+    wanted = defaultdict(int)
+    for line in lines:
+        wanted[(line["product"], line.get("size", ""))] += line["quantity"]
+
+    products = Product.objects.filter(is_active=True, available=True).only("id", "name", "price", "sizes").in_bulk(
+        {product_id for product_id, _size in wanted}
+    )
+    total = 0
+    items = []
+    quantities = defaultdict(int)
+    for (product_id, size), quantity in wanted.items():
+        product = products.get(product_id)
+        if product is None:
+            raise ValidationError({"items": f"Product {product_id} is not available."})
+        if product.sizes and size not in product.sizes:
+            raise ValidationError({"items": f"{product.name} is not available in size '{size}'."})
+        subtotal = product.price * quantity
+        total += subtotal
+        quantities[product_id] += quantity
+        items.append({
+            "product": product_id,
+            "name": product.name,
+            "size": size,
+            "quantity": quantity,
+            "price": str(product.price),
+            "subtotal": str(subtotal),
+        })
+    return total, items, quantities
+
+
+def place_order(user, lines, reference, metadata=None):
+    """
+    Price the lines server-side and create the order with its stock held (see
+    products.inventory), atomically.
+    """
+    total, items, quantities = price_lines(lines)
+    with transaction.atomic():
+        order = Order.objects.create(
+            user=user,
+            reference=reference,
+            amount=total,
+            status="initiated",
+            confirm_status="pending",
+            metadata={**(metadata or {}), "items": items},
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order, product_id=item["product"], name=item["name"], unit_price=item["price"],
+                size=item["size"], quantity=item["quantity"], created_at=order.created_at,
+            )
+            for item in items
+        ])
+        inventory.reserve(order, quantities)
+    return order
+
+
+def confirm_payments(queryset):
+    """
+    Confirm every pending order in queryset: one guarded UPDATE, the holds turned
+    into stock decrements, and all confirmation mails rendered and queued in one
+    batch. Returns the orders that were confirmed.
+    """
+    with transaction.atomic():
+        orders = queryset.transition("confirm")
+        prefetch_related_objects(orders, "items")
+        inventory.commit_orders(orders)
+        users = get_user_model().objects.only("id", "username", "email").in_bulk({o.user_id for o in orders})
+        for order in orders:
+            order.user = users[order.user_id]
+        queue_kind_emails("payment_confirmed", [([o.user.email], order_email_context(o)) for o in orders])
+    return orders
+
+
+def reverse_payments(queryset):
+    """Reverse every confirmed order in queryset and put its units back in stock."""
+    with transaction.atomic():
+        orders = queryset.transition("reverse")
+        prefetch_related_objects(orders, "items")
+        inventory.reverse_orders(orders)
+    return orders
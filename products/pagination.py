@@ -0,0 +1,132 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.db.models import BooleanField, F, Func, Value
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("cursor") pagination over (created_at, id), newest first.
+
+    Each page is a `WHERE (created_at, id) < (cursor)` range scan on a matching
+    index, so there is no COUNT(*) and page 500 costs the same as page 1.
+    Clients that still send ?page=, and querysets already ordered by something
+    else (search rank, ?ordering=price), get the regular PageNumberPagination.
+    """
+    page_size = PageNumberPagination.page_size
+    cursor_query_param = "cursor"
+    ordering = ("-created_at", "-id")
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self):
+        self.fallback = None
+
+    # cursor = "<created_at iso>|<id>|<r if paging backwards>"
+    def encode_cursor(self, row, reverse=False):
+        raw = f"{row.created_at.isoformat()}|{row.pk}|{'r' if reverse else ''}"
+        return urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, pk, reverse = urlsafe_b64decode(encoded.encode()).decode().split("|")
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk, reverse == "r"
+
+    def row_comparison(self, op, created_at, pk):
+        # a real row comparison, ((created_at, id) < (%s, %s)): Postgres turns
+        # it into one index range condition, where the equivalent OR of two
+        # terms becomes a filter. An expression, so it composes like any filter.
+        def row(*values):
+            return Func(*values, function="")
+        return Func(
+            row(F("created_at"), F("id")), row(Value(created_at), Value(pk)),
+            function="", arg_joiner=f" {op} ", output_field=BooleanField(),
+        )
+
+    def use_fallback(self, queryset, request):
+        if "page" in request.query_params:
+            return True
+        order_by = tuple(queryset.query.order_by)
+        return bool(order_by) and order_by != self.ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_fallback(queryset, request):
+            self.fallback = PageNumberPagination()
+            return self.fallback.paginate_queryset(queryset, request, view)
+
+        self.request = request
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor[2])
+        if cursor:
+            created_at, pk, _ = cursor
+            queryset = queryset.filter(self.row_comparison(">" if reverse else "<", created_at, pk))
+        queryset = queryset.order_by("created_at", "id") if reverse else queryset.order_by(*self.ordering)
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.has_next = has_more if not reverse else True
+        self.has_previous = has_more if reverse else cursor is not None
+        self.first, self.last = (rows[0], rows[-1]) if rows else (None, None)
+        return rows
+
+    def get_link(self, row, reverse):
+        url = self.request.build_absolute_uri()
+        if row is None:
+            return None
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(row, reverse))
+
+    def get_next_link(self):
+        return self.get_link(self.last, reverse=False) if self.has_next else None
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first is None:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.get_link(self.first, reverse=True)
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            "name": self.cursor_query_param,
+            "required": False,
+            "in": "query",
+            "description": "Opaque cursor from the next / previous links.",
+            "schema": {"type": "string"},
+        }]
@@ -0,0 +1,122 @@
+import calendar
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Greatest, TruncMonth
+
+from .models import SALES_ROLLUP_FIELDS, Sale, SalesRollup
+
+# P&L reporting answers from SalesRollup (one row per day and per month of
+# date_paid), never from the Sale ledger, so a report costs the same whether
+# the ledger holds a thousand rows or a million.
+
+CENT = Decimal("0.01")
+
+
+def rollup_stats(granularity, sales=None):
+    """Sale totals grouped by day or month, as {"period", <SALES_ROLLUP_FIELDS>} rows."""
+    money = DecimalField(max_digits=14, decimal_places=2)
+    difference = F("amount_paid") - F("cost_of_production") - F("workmanship")
+    period = F("date_paid") if granularity == "day" else TruncMonth("date_paid")
+    sales = Sale.objects.all() if sales is None else sales
+    return (
+        sales.order_by().annotate(period=period).values("period").annotate(
+            # before the sums below, which reuse the column names as aliases
+            profit=Sum(Greatest(difference, Value(0), output_field=money)),
+            loss=Sum(Greatest(-difference, Value(0), output_field=money)),
+            sales=Count("id"),
+            revenue=Sum("amount_paid"),
+            cost_of_production=Sum("cost_of_production"),
+            workmanship=Sum("workmanship"),
+        )
+    )
+
+
+def _next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _is_month_end(day):
+    return day.day == calendar.monthrange(day.year, day.month)[1]
+
+
+def _month_rows(start, end):
+    """
+    Month totals for [start, end]. Calendar months wholly inside the range come
+    from the month rollups; a partial first/last month is summed from its day
+    rows, so the figures match the exact range (at most ~62 extra rows).
+    """
+    full_from = None if start is None else (start if start.day == 1 else _next_month(start))
+    full_to = None
+    if end is not None:
+        full_to = end.replace(day=1) if _is_month_end(end) else (end.replace(day=1) - timedelta(days=1)).replace(day=1)
+
+    months = SalesRollup.objects.filter(granularity="month")
+    full = Q()
+    if full_from is not None:
+        months = months.filter(period__gte=full_from)
+        full &= Q(period__gte=full_from)
+    if full_to is not None:
+        months = months.filter(period__lte=full_to)
+        full &= Q(period__lt=_next_month(full_to))
+    totals = {row["period"]: row for row in months.values("period", *SALES_ROLLUP_FIELDS)}
+
+    partial_start = start is not None and start.day != 1
+    partial_end = end is not None and not _is_month_end(end)
+    if partial_start or partial_end:
+        edges = _day_rows(start, end).exclude(full).annotate(month=TruncMonth("period")).values("month")
+        edges = edges.annotate(**{field: Sum(field) for field in SALES_ROLLUP_FIELDS}).order_by()
+        for row in edges:
+            month = row.pop("month")
+            current = totals.setdefault(month, dict.fromkeys(SALES_ROLLUP_FIELDS, 0) | {"period": month})
+            for field in SALES_ROLLUP_FIELDS:
+                current[field] += row[field]
+    return [totals[period] for period in sorted(totals)]
+
+
+def _day_rows(start, end):
+    days = SalesRollup.objects.filter(granularity="day")
+    if start is not None:
+        days = days.filter(period__gte=start)
+    if end is not None:
+        days = days.filter(period__lte=end)
+    return days
+
+
+def _figures(row):
+    revenue = Decimal(row["revenue"])
+    net = Decimal(row["profit"]) - Decimal(row["loss"])
+    return {
+        "sales": row["sales"],
+        "revenue": str(revenue.quantize(CENT)),
+        "cost_of_production": str(Decimal(row["cost_of_production"]).quantize(CENT)),
+        "workmanship": str(Decimal(row["workmanship"]).quantize(CENT)),
+        "profit": str(Decimal(row["profit"]).quantize(CENT)),
+        "loss": str(Decimal(row["loss"]).quantize(CENT)),
+        "net": str(net.quantize(CENT)),
+        # net as a percentage of revenue
+        "margin": str((net * 100 / revenue).quantize(CENT)) if revenue else None,
+    }
+
+
+def sales_summary(granularity="month", start=None, end=None):
+    """P&L per day or month of date_paid between `start` and `end` (dates, inclusive), plus totals."""
+    if granularity == "day":
+        rows = list(_day_rows(start, end).order_by("period").values("period", *SALES_ROLLUP_FIELDS))
+    else:
+        rows = _month_rows(start, end)
+    # a period whose sales were all deleted keeps a zero row
+    rows = [row for row in rows if row["sales"]]
+
+    totals = dict.fromkeys(SALES_ROLLUP_FIELDS, 0)
+    for row in rows:
+        for field in SALES_ROLLUP_FIELDS:
+            totals[field] += row[field]
+    return {
+        "granularity": granularity,
+        "from": start.isoformat() if start else None,
+        "to": end.isoformat() if end else None,
+        "periods": [{"period": row["period"].isoformat(), **_figures(row)} for row in rows],
+        "totals": _figures(totals),
+    }
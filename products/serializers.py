@@ -1,41 +1,127 @@
 from rest_framework import serializers
-from django.db.models import Avg
-from .models import Category, Product, Review, Order
+from rest_framework.reverse import reverse
+from .models import Category, Product, Review, Order, GENDER_CHOICES, RATING_SUMMARY_FIELDS
 from django.conf import settings
 from userapp.serializers import UserSerializer
 
 from .models import Sale
 
+def split_query_param(request, name):
+    """?name=a,b,c -> {"a","b","c"} (empty set when missing)."""
+    if request is None:
+        return set()
+    raw = request.query_params.get(name, "")
+    return {part.strip() for part in raw.split(",") if part.strip()}
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets for the top-level serializer of a request.
+    ?fields=id,name keeps only those fields, ?expand=reviews adds fields listed
+    in Meta.expandable_fields (which are left out by default).
+    """
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request") if self._is_root() else None
+
+        expand = split_query_param(request, "expand")
+        for name in getattr(self.Meta, "expandable_fields", ()):
+            if name not in expand:
+                fields.pop(name, None)
+
+        wanted = split_query_param(request, "fields")
+        if wanted:
+            for name in list(fields):
+                if name not in wanted:
+                    fields.pop(name)
+        return fields
+
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ("id","name","slug")
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     class Meta:
         model = Review
         fields = ("id","user","rating","comment","created_at")
 
-        
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
-    avg_rating = serializers.SerializerMethodField()
-    reviews = ReviewSerializer(many=True, read_only=True)
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
+    # newest EMBEDDED_REVIEWS_LIMIT only; the full list is at reviews_url
+    reviews = ReviewSerializer(source="latest_reviews", many=True, read_only=True)
+    reviews_url = serializers.SerializerMethodField()
+    class Meta:
+        model = Product
+        fields = ("id","name","slug","description","price","available","category","gender","color","pieces_available","size_guide","sizes","image1","image2","avg_rating","review_count","rating_histogram","reviews","reviews_url")
+
+    def get_reviews_url(self, obj):
+        return reverse("product-reviews", kwargs={"product_id": obj.pk}, request=self.context.get("request"))
+
+
+class ProductListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Compact projection for the catalog grid (list / related)."""
+    image = serializers.SerializerMethodField()
+    reviews = ReviewSerializer(source="latest_reviews", many=True, read_only=True)
     class Meta:
         model = Product
-        fields = ("id","name","slug","description","price","available","category","gender","color","pieces_available","size_guide","sizes","image1","image2","avg_rating","reviews")
+        fields = ("id","name","slug","price","image","avg_rating","review_count","reviews")
+        expandable_fields = ("reviews",)
+
+    def get_image(self, obj):
+        image = obj.image1 or obj.image2
+        return image.url if image else None
 
-    def get_avg_rating(self,obj):
-        return obj.reviews.aggregate(avg=Avg("rating"))["avg"] or 0
 
 class ProductCreateUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
-        fields = "__all__"
+        exclude = ("search_vector",)
+        read_only_fields = RATING_SUMMARY_FIELDS + ("avg_rating",)
+
+class SizesField(serializers.ListField):
+    """A list, or "S,M,L" / "S|M|L" as written in a CSV cell."""
+    child = serializers.CharField(max_length=10)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = [size.strip() for size in data.replace("|", ",").split(",") if size.strip()]
+        return super().to_internal_value(data)
+
+
+class ProductImportSerializer(serializers.Serializer):
+    """
+    One row of a bulk import (products.imports). A row with an `id`, or the
+    `slug` of an existing product, updates only the fields it gives; any
+    other row creates a product and needs name and price. `category` is a
+    category id or slug, resolved for the whole batch at once.
+    """
+    id = serializers.IntegerField(required=False, min_value=1)
+    slug = serializers.SlugField(required=False, max_length=220)
+    name = serializers.CharField(required=False, max_length=200)
+    description = serializers.CharField(required=False, allow_blank=True)
+    price = serializers.DecimalField(required=False, max_digits=10, decimal_places=2, min_value=0)
+    available = serializers.BooleanField(required=False)
+    is_active = serializers.BooleanField(required=False)
+    category = serializers.CharField(required=False, allow_blank=True)
+    gender = serializers.ChoiceField(required=False, choices=GENDER_CHOICES)
+    color = serializers.CharField(required=False, allow_blank=True, max_length=50)
+    pieces_available = serializers.IntegerField(required=False, min_value=0)
+    size_guide = serializers.CharField(required=False, allow_blank=True)
+    sizes = SizesField(required=False)
+
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = serializers.SerializerMethodField()
     class Meta:
         model = Order
@@ -53,6 +139,25 @@ class OrderSerializer(serializers.ModelSerializer):
 
 
 
+class OrderLineSerializer(serializers.Serializer):
+    product = serializers.IntegerField(min_value=1)
+    size = serializers.CharField(required=False, allow_blank=True, default="")
+    quantity = serializers.IntegerField(min_value=1, max_value=100, default=1)
+
+
+class OrderCreateSerializer(serializers.Serializer):
+    """Line items only; prices and the total come from the Product table."""
+    items = OrderLineSerializer(many=True, allow_empty=False)
+    metadata = serializers.DictField(required=False, default=dict)
+
+
+class OrderBulkStatusSerializer(serializers.Serializer):
+    action = serializers.ChoiceField(choices=["confirm", "reverse"])
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=settings.ORDER_BULK_MAX
+    )
+
+
 class SaleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Sale
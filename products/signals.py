@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import caching, inventory
+from .models import Category, Product, Review, Sale, SalesRollup
+
+
+# Keep Product's rating summary in step with the Review table. Edits of an
+# existing rating are handled by ReviewAdmin.save_model.
+@receiver(post_save, sender=Review)
+def review_created(sender, instance, created, **kwargs):
+    if created:
+        Product.objects.filter(pk=instance.product_id).adjust_rating_summary(instance.rating, 1)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    Product.objects.filter(pk=instance.product_id).adjust_rating_summary(instance.rating, -1)
+
+
+# Sales rollups: Sale.save adjusts them itself (it needs the old row on edits).
+@receiver(post_delete, sender=Sale)
+def sale_deleted(sender, instance, **kwargs):
+    SalesRollup.objects.adjust(removed=[instance])
+
+
+# Cache invalidation: bump the generation of every namespace a write touches,
+# once the transaction has committed so readers can't re-cache the old rows.
+def bump_on_commit(*namespaces):
+    transaction.on_commit(lambda: caching.bump(*namespaces))
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_changed(sender, instance, **kwargs):
+    bump_on_commit(caching.PRODUCTS, caching.RELATED)
+    # stock may have been edited: re-seed the reservation counter from the row
+    pk = instance.pk
+    transaction.on_commit(lambda: inventory.forget_stock([pk]))
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, **kwargs):
+    bump_on_commit(caching.CATEGORIES)
+
+
+@receiver([post_save, post_delete], sender=Review)
+def review_changed(sender, **kwargs):
+    bump_on_commit(caching.REVIEWS)
@@ -1,3 +1,87 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .emails import order_email_context
+from .models import Order, OrderItem
+
+
+class OrderListTests(TestCase):
+    url = "/api/products/orders/"
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="pw")
+        cls.users = [
+            User.objects.create_user(username=f"buyer{i}", email=f"buyer{i}@example.com", password="pw")
+            for i in range(6)
+        ]
+        for i, user in enumerate(cls.users):
+            Order.objects.create(
+                user=user, reference=f"ref{i:03d}", amount="10.00",
+                status="paid" if i % 2 else "initiated",
+                confirm_status="confirmed" if i % 2 else "pending",
+            )
+        # one order from last week
+        old = Order.objects.create(user=cls.users[0], reference="old001", amount="5.00")
+        Order.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=7))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def results(self, query=""):
+        response = self.client.get(self.url + query)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()["results"]
+
+    def test_page_is_one_query(self):
+        # users come from the same query, however many distinct buyers are on the page
+        with self.assertNumQueries(1):
+            rows = self.results()
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[0]["user"]["username"], "buyer5")
+
+    def test_filters(self):
+        self.assertEqual({r["reference"] for r in self.results("?confirm_status=confirmed")}, {"ref001", "ref003", "ref005"})
+        self.assertEqual(len(self.results("?status=initiated,paid")), 7)
+        self.assertEqual([r["reference"] for r in self.results("?reference=old")], ["old001"])
+        self.assertEqual(len(self.results(f"?user={self.users[0].pk}")), 2)
+        today = timezone.localdate().isoformat()
+        self.assertEqual(len(self.results(f"?from={today}&to={today}")), 6)
+        self.assertEqual(len(self.results(f"?to={(timezone.localdate() - timedelta(days=1)).isoformat()}")), 1)
+
+    def test_invalid_filters(self):
+        for query in ("?status=shipped", "?from=yesterday", "?user=me"):
+            self.assertEqual(self.client.get(self.url + query).status_code, 400, query)
+
+    def test_customers_only_see_their_orders(self):
+        self.client.force_authenticate(self.users[0])
+        rows = self.results(f"?user={self.users[1].pk}")
+        self.assertEqual({r["reference"] for r in rows}, {"ref000", "old001"})
+
+
+class OrderEmailContextTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="buyer", email="buyer@example.com", password="pw")
+
+    def test_names_from_items(self):
+        order = Order.objects.create(user=self.user, reference="new001", amount="10.00")
+        OrderItem.objects.create(order=order, name="Gele", unit_price="10.00", quantity=1)
+        self.assertEqual(order_email_context(order)["product_names"], "Gele")
+
+    def test_names_from_metadata_snapshot(self):
+        # placed before OrderItem existed, not backfilled yet
+        order = Order.objects.create(user=self.user, reference="old001", amount="10.00", metadata={
+            "items": [{"id": 1, "name": "Aso oke", "qty": 1}, {"product": 2, "name": "Gele"}, "junk"],
+        })
+        self.assertEqual(order_email_context(order)["product_names"], "Aso oke, Gele")
 
-# Create your tests here.
+    def test_no_items_at_all(self):
+        order = Order.objects.create(user=self.user, reference="none01", amount="10.00")
+        self.assertEqual(order_email_context(order)["product_names"], "Product(s)")
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import AllReviewsView, CategoryViewSet, OrderDetailView, OrderMarkPaidView, ProductViewSet, ProductReviewsView, OrderListView, ReversePaymentView
-from .views import SaleListCreateView, SaleRetrieveUpdateDestroyView, OrderCreateView, ConfirmPaymentView
+from .views import SaleListCreateView, SaleRetrieveUpdateDestroyView, SalesSummaryView, OrderCreateView, OrderExportView, SaleExportView, ConfirmPaymentView, OrderBulkStatusView
 
 
 router = DefaultRouter()
@@ -17,9 +17,13 @@ urlpatterns = [
     path("orders/<int:pk>/mark-paid/", OrderMarkPaidView.as_view(), name="order-mark-paid"),
     path("sales/", SaleListCreateView.as_view(), name="sales"),
     path("sales/<int:pk>/", SaleRetrieveUpdateDestroyView.as_view(), name="sale-detail"),
+    path("sales/summary/", SalesSummaryView.as_view(), name="sales-summary"),
+    path("sales/export/", SaleExportView.as_view(), name="sales-export"),
     path("orders/<int:pk>/confirm-payment/", ConfirmPaymentView.as_view(), name="confirm-payment"),
     path("reviews/all/", AllReviewsView.as_view(), name="all-reviews"),
     path("orders/<int:pk>/reverse-payment/", ReversePaymentView.as_view(), name="reverse-payment"),
+    path("orders/bulk-status/", OrderBulkStatusView.as_view(), name="orders-bulk-status"),
+    path("orders/export/", OrderExportView.as_view(), name="orders-export"),
 
    
 ]
@@ -1,80 +1,71 @@
+from django.db.models import Q
 from django.utils.text import slugify
 
 # productapp/utils.py
-from django.core.mail import send_mail
-from django.conf import settings
 
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
-from datetime import datetime
+# attempts at saving with freshly allocated slugs before giving up
+SLUG_ATTEMPTS = 3
+
+
+def allocate_unique_slugs(model_class, names, reserved=()):
+    """
+    Slugs for many names with one query: every stored slug equal to a base or
+    starting with "<base>-" is read at once, then each name takes the first
+    free one of base, base-1, base-2, ... (names in the same batch, and the
+    `reserved` slugs about to be saved alongside them, included).
+    Another worker can still take a slug in between, so the unique index has
+    the last word: callers retry on IntegrityError.
+    """
+    bases = [slugify(name) or model_class._meta.model_name for name in names]
+    taken = Q()
+    for base in set(bases):
+        taken |= Q(slug=base) | Q(slug__startswith=f"{base}-")
+    taken = set(model_class.objects.filter(taken).values_list("slug", flat=True)) if bases else set()
+    taken.update(reserved)
+
+    slugs = []
+    for base in bases:
+        slug, counter = base, 0
+        while slug in taken:
+            counter += 1
+            slug = f"{base}-{counter}"
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
 
 def generate_unique_slug(model_class, name):
-    base_slug = slugify(name)
-    slug = base_slug
-    counter = 1
-    while model_class.objects.filter(slug=slug).exists():
-        slug = f"{base_slug}-{counter}"
-        counter += 1
-    return slug
+    return allocate_unique_slugs(model_class, [name])[0]
 
 
 
 
 
 
-def send_transaction_emails(admin_email, customer_email, context):
-    # ✅ Logo and year
-    logo_url = f"{settings.SITE_URL}/static/images/heromefab.jpg"
-    year = datetime.now().year
-
-    # ✅ ADMIN EMAIL
-    admin_html = render_to_string("email_template.html", {
-        "logo_url": logo_url,
-        "year": year,
-        "body_content": f"""
-            <h2>New Payment Received</h2>
-            <p>Hello Admin,</p>
-            <p>You have received a new payment from <b>{context['customer_name']}</b>.</p>
-            <p><b>Product(s):</b> {context['product_names']}<br>
-            <b>Amount:</b> ₦{context['amount']}<br>
-            <b>Transaction Reference:</b> {context['reference']}</p>
-            <p>Login to your dashboard to confirm payment.</p>
-        """
-    })
-    admin_text = strip_tags(admin_html)
-
-    msg_admin = EmailMultiAlternatives(
-        subject=f"New Payment Received - {context['reference']}",
-        body=admin_text,
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        to=[admin_email],
-    )
-    msg_admin.attach_alternative(admin_html, "text/html")
-    msg_admin.send(fail_silently=False)
-
-    # ✅ CUSTOMER EMAIL
-    customer_html = render_to_string("email_template.html", {
-        "logo_url": logo_url,
-        "year": year,
-        "body_content": f"""
-            <h2>Payment Initiated</h2>
-            <p>Hi {context['customer_name']},</p>
-            <p>Your payment of ₦{context['amount']} for <b>{context['product_names']}</b> has been acknowledged.</p>
-            <p>Please wait while we confirm your payment. Thank you for shopping with <span class="highlight">Herome_Fab</span>!</p>
-            <p><b>Transaction Reference:</b> {context['reference']}</p>
-        """
-    })
-    customer_text = strip_tags(customer_html)
-
-    msg_customer = EmailMultiAlternatives(
-        subject=f"Payment Received - Reference {context['reference']}",
-        body=customer_text,
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        to=[customer_email],
-    )
-    msg_customer.attach_alternative(customer_html, "text/html")
-    msg_customer.send(fail_silently=False)
+def parse_int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
 
+def snapshot_lines(metadata):
+    """
+    (product id or None, quantity, item dict) for each line of an
+    Order.metadata["items"] snapshot, the only record of an order's lines
+    before OrderItem. Malformed entries are skipped.
+    """
+    items = metadata.get("items") if isinstance(metadata, dict) else None
+    for item in items if isinstance(items, list) else []:
+        if isinstance(item, dict):
+            product_id = parse_int(item.get("product", item.get("id")), None)
+            yield product_id, max(parse_int(item.get("quantity", item.get("qty")), 1), 1), item
 
 
+def send_transaction_emails(admin_email, customer_email, context):
+    # queued on the outbox (delivered by run_email_worker), so call this inside
+    # the transaction that records the payment
+    from .emails import queue_kind_email
+
+    queue_kind_email("payment_received_admin", [admin_email], context)
+    queue_kind_email("payment_received_customer", [customer_email], context)
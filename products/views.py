@@ -8,9 +8,13 @@ from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import Category, Product, Review, Order
+from .models import Category, Product, Review, Order, EMBEDDED_REVIEWS_LIMIT
 from .serializers import CategorySerializer, ProductSerializer, ProductCreateUpdateSerializer, ReviewSerializer, OrderSerializer
+from .serializers import ProductListSerializer, OrderCreateSerializer, OrderBulkStatusSerializer, split_query_param
 from .permissions import IsAdminOrReadOnly, IsOwnerOrAdmin
+from .filters import OrderFilters, ProductFacets, SaleFilters
+from .pagination import KeysetPagination
+from . import caching
 from django.conf import settings
 from rest_framework.parsers import MultiPartParser, FormParser 
 
@@ -27,18 +31,25 @@ import uuid
 from decimal import Decimal
 from django.utils import timezone
 from .utils import send_transaction_emails
+from .emails import order_email_context
+from .orders import place_order, confirm_payments, reverse_payments
+from .reports import sales_summary
+from . import exports
+from herome_fab.renderers import ORJSONRenderer
+from herome_fab.parsers import CSVParser, ORJSONParser
+from .imports import import_products
+from django.utils.dateparse import parse_date
+from . import inventory
 
 from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
-from datetime import datetime
 from django.utils import timezone
 from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control
 
 
 
@@ -50,24 +61,11 @@ class CategoryViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdminOrReadOnly]
 
     def list(self, request, *args, **kwargs):
-        cache_key = "categories:list"
-
-        cached = cache.get(cache_key)
-        if cached:
-            return Response(cached)
-
-        qs = self.queryset
-        page = self.paginate_queryset(qs)
-
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            response = self.get_paginated_response(serializer.data)
-        else:
-            serializer = self.get_serializer(qs, many=True)
-            response = Response(serializer.data)
-
-        cache.set(cache_key, response.data, 30)
-        return response
+        cache_key = caching.versioned_key("categories:list", caching.CATEGORIES)
+        return caching.cached_response(
+            request, cache_key, lambda: super(CategoryViewSet, self).list(request, *args, **kwargs).data,
+            settings.CATALOG_CACHE_TIMEOUT,
+        )
 
 
 
@@ -77,8 +75,9 @@ class ProductViewSet(viewsets.ModelViewSet):
     serializer_class = ProductSerializer
     permission_classes = [IsAdminOrReadOnly]
     parser_classes = [MultiPartParser, FormParser]
-    filter_backends = [filters.SearchFilter]
-    search_fields = ["name","description"]
+    pagination_class = KeysetPagination
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ["avg_rating","review_count","price","created_at"]
 
     def create(self, request, *args, **kwargs):
         print(">>> DEBUG: Authenticated user:", request.user)
@@ -99,8 +98,6 @@ class ProductViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         serializer.save(available=True, is_active=True)
 
-        cache.delete_pattern("products:*")
-
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
     def update(self, request, *args, **kwargs):
@@ -123,47 +120,83 @@ class ProductViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action in ["create","update","partial_update"]:
             return ProductCreateUpdateSerializer
+        if self.action in ["list","related"]:
+            return ProductListSerializer
         return ProductSerializer
 
+    def get_queryset(self):
+        qs = super().get_queryset()
+        # read paths: reviews (+ users) are only prefetched where they are rendered
+        if self.action == "retrieve":
+            qs = qs.for_display(reviews_limit=EMBEDDED_REVIEWS_LIMIT)
+        elif self.action in ["list","related"]:
+            if "reviews" in split_query_param(self.request, "expand"):
+                qs = qs.with_reviews(limit=EMBEDDED_REVIEWS_LIMIT)
+        return qs
+
+    def fieldset_cache_suffix(self):
+        """?fields= / ?expand= normalised into a cache-key fragment."""
+        fields = ",".join(sorted(split_query_param(self.request, "fields")))
+        expand = ",".join(sorted(split_query_param(self.request, "expand")))
+        return f"fields={fields}:expand={expand}"
+
     
 
     def list(self, request, *args, **kwargs):
         category = request.query_params.get("category")
         search = request.query_params.get("search")
+        ordering = request.query_params.get("ordering")
+        min_rating = request.query_params.get("min_rating")
         page_num = request.query_params.get("page", 1)
+        cursor = request.query_params.get("cursor")
 
-        cache_key = f"products:list:cat={category}:search={search}:page={page_num}"
-
-        cached = cache.get(cache_key)
-        if cached:
-            return Response(cached)
+        try:
+            min_rating = float(min_rating) if min_rating else None
+        except ValueError:
+            return Response({"min_rating": "must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+        facets = ProductFacets(request.query_params)
+
+        cache_key = caching.versioned_key(
+            f"products:list:cat={category}:search={search}:ordering={ordering}:min_rating={min_rating}"
+            f":{facets.cache_fragment()}:page={page_num}:cursor={cursor}:{self.fieldset_cache_suffix()}",
+            caching.PRODUCTS, caching.CATEGORIES, caching.REVIEWS,
+        )
+        return caching.cached_response(
+            request, cache_key, lambda: self.build_list_data(category, search, min_rating, facets),
+            settings.CATALOG_CACHE_TIMEOUT,
+        )
 
-        qs = self.queryset
+    def build_list_data(self, category, search, min_rating, facets):
+        request = self.request
+        qs = self.get_queryset()
         if category:
             qs = qs.filter(category__slug=category)
+        # full-text search over name/description/color/category, ranked unless ?ordering= is given
         if search:
-            qs = qs.filter(name__icontains=search)
+            qs = qs.search(search)
+        # stored avg_rating column (indexed), no GROUP BY over reviews
+        if min_rating is not None:
+            qs = qs.filter(avg_rating__gte=min_rating)
+        facet_counts = facets.counts(qs)
+        qs = facets.filter(qs)
+        qs = filters.OrderingFilter().filter_queryset(request, qs, self)
+        # newest first by default; anything else (rank, ?ordering=) pages by number
+        if not qs.query.order_by:
+            qs = qs.order_by(*KeysetPagination.ordering)
 
         page = self.paginate_queryset(qs)
 
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            response = self.get_paginated_response(serializer.data)
-        else:
-            serializer = self.get_serializer(qs, many=True)
-            response = Response(serializer.data)
-
-        cache.set(cache_key, response.data, 60 * 5)
-        return response
+            data = self.get_paginated_response(serializer.data).data
+            data["facets"] = facet_counts
+            return data
+        return self.get_serializer(qs, many=True).data
     
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()  # get the product being deleted
         self.perform_destroy(instance)  # actually delete it from the database
-
-        # Clear caches
-        cache.delete(f"product:{instance.id}")      # delete individual product cache
-        cache.delete_pattern("products:*")          # delete any product list caches
-
+        # cached product pages are invalidated by the post_delete signal (products.signals)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -172,69 +205,128 @@ class ProductViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=["get"], permission_classes=[permissions.AllowAny])
     def related(self, request, pk=None):
-        cache_key = f"product:related:{pk}"
+        cache_key = caching.versioned_key(
+            f"product:related:{pk}:{self.fieldset_cache_suffix()}", caching.RELATED, caching.REVIEWS
+        )
+
+        def build():
+            p = get_object_or_404(self.queryset.only("pk","category_id"), pk=pk)
+            qs = self.get_queryset().filter(category_id=p.category_id).exclude(pk=p.pk)[:10]
+            return self.get_serializer(qs, many=True).data
 
-        cached = cache.get(cache_key)
-        if cached:
-            return Response(cached)
+        return caching.cached_response(request, cache_key, build, settings.CATALOG_CACHE_TIMEOUT)
 
-        p = self.get_object()
-        qs = Product.objects.filter(category=p.category).exclude(pk=p.pk)[:10]
-        data = ProductSerializer(qs, many=True).data
 
-        cache.set(cache_key, data, 60 * 10)
-        return Response(data)
+    @action(detail=False, methods=["get"], permission_classes=[permissions.AllowAny])
+    def suggest(self, request):
+        # normalise so "  Red  GOWN" and "red gown" share one cache entry
+        q = " ".join(request.query_params.get("q", "").lower().split())[:50]
+        try:
+            # clamped, so a negative limit can't reach the slice and 0 gets no cache entry
+            limit = max(1, min(int(request.query_params.get("limit", 8)), settings.SUGGEST_MAX_RESULTS))
+        except ValueError:
+            limit = 8
 
+        if len(q) < 2:
+            data = {"query": q, "products": [], "categories": []}
+        else:
+            cache_key = caching.versioned_key(f"products:suggest:{q}:{limit}", caching.PRODUCTS, caching.CATEGORIES)
+            data = cache.get(cache_key)
+            if data is None:
+                products = self.queryset.suggest_names(q, limit)
+                categories = Category.objects.filter(name__trigram_word_similar=q).order_by("name")[:limit]
+                data = {
+                    "query": q,
+                    "products": [row["name"] for row in products],
+                    "categories": [{"name": c.name, "slug": c.slug} for c in categories],
+                }
+                cache.set(cache_key, data, settings.SUGGEST_CACHE_TIMEOUT)
+
+        response = Response(data)
+        patch_cache_control(response, public=True, max_age=settings.SUGGEST_CACHE_TIMEOUT)
+        return response
+
+    @action(detail=False, methods=["post"], permission_classes=[permissions.IsAdminUser],
+            parser_classes=[ORJSONParser, CSVParser])
+    def bulk(self, request):
+        """
+        Create/update many products from a JSON list (or {"products": [...]})
+        or a CSV body; see ProductImportSerializer for the row format. All rows
+        are validated before anything is written.
+        """
+        rows = request.data.get("products") if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list) or not rows:
+            return Response({"detail": "Send a non-empty list of products."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > settings.PRODUCT_IMPORT_MAX:
+            return Response(
+                {"detail": f"At most {settings.PRODUCT_IMPORT_MAX} products per request."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        created, updated = import_products(rows)
+        return Response({
+            "created": len(created),
+            "updated": len(updated),
+            "products": [{"id": p.pk, "slug": p.slug, "name": p.name} for p in created + updated],
+        }, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["post"], permission_classes=[permissions.IsAuthenticated])
     def reviews(self, request, pk=None):
         product = self.get_object()
         if Review.objects.filter(product=product, user=request.user).exists():
             return Response({"detail":"You already reviewed this product"}, status=status.HTTP_400_BAD_REQUEST)
-        rating = int(request.data.get("rating",0))
+        try:
+            rating = int(request.data.get("rating",0))
+        except (TypeError, ValueError):
+            rating = 0
+        if not 1 <= rating <= 5:
+            return Response({"detail":"Rating must be between 1 and 5"}, status=status.HTTP_400_BAD_REQUEST)
         comment = request.data.get("comment","")
-        review = Review.objects.create(product=product, user=request.user, rating=rating, comment=comment)
+        # the review and the product's rating summary (post_save signal) commit together
+        with transaction.atomic():
+            review = Review.objects.create(product=product, user=request.user, rating=rating, comment=comment)
         return Response(ReviewSerializer(review).data, status=status.HTTP_201_CREATED)
     
 
     def retrieve(self, request, *args, **kwargs):
         pk = kwargs["pk"]
-        cache_key = f"product:detail:{pk}"
-
-        cached = cache.get(cache_key)
-        if cached:
-            return Response(cached)
-
-        response = super().retrieve(request, *args, **kwargs)
-
-        cache.set(cache_key, response.data, 60 * 5)
-        return response
+        cache_key = caching.versioned_key(
+            f"product:detail:{pk}:{self.fieldset_cache_suffix()}", caching.PRODUCTS, caching.CATEGORIES, caching.REVIEWS
+        )
+        return caching.cached_response(
+            request, cache_key, lambda: super(ProductViewSet, self).retrieve(request, *args, **kwargs).data,
+            settings.CATALOG_CACHE_TIMEOUT,
+        )
 
 
 # List reviews for a product
 class ProductReviewsView(generics.ListAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = KeysetPagination
     def get_queryset(self):
         pid = self.kwargs.get("product_id")
-        return Review.objects.filter(product_id=pid)
+        return Review.objects.filter(product_id=pid).select_related("user").order_by("-created_at", "-id")
     
     
 class AllReviewsView(generics.ListAPIView):
-    queryset = Review.objects.all().order_by("-created_at")
+    queryset = Review.objects.select_related("user").order_by("-created_at", "-id")
     serializer_class = ReviewSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = KeysetPagination
 
 
 # Orders listing
 class OrderListView(generics.ListAPIView):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     def get_queryset(self):
         user = self.request.user
-        if user.is_superuser:
-            return Order.objects.all().order_by("-created_at")
-        return Order.objects.filter(user=user).order_by("-created_at")
+        # the serializer reads order.user: join it instead of one query per row
+        qs = Order.objects.select_related("user").order_by("-created_at", "-id")
+        if not user.is_superuser:
+            qs = qs.filter(user=user)
+        return OrderFilters(self.request.query_params).filter(qs, allow_user=user.is_superuser)
 
 
 # Create an order (called from Cart -> AccountDetails flow)
@@ -242,29 +334,18 @@ class OrderCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
-        user = request.user
-        amount = request.data.get("amount")
-        metadata = request.data.get("metadata", {})
-
-        if not amount:
-            return Response({"error": "amount is required"}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = OrderCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
         # generate short unique reference
         reference = str(uuid.uuid4()).replace("-", "")[:12]
 
-        # ensure amount decimal
-        try:
-            amount_val = Decimal(amount)
-        except Exception:
-            return Response({"error": "invalid amount"}, status=status.HTTP_400_BAD_REQUEST)
-
-        order = Order.objects.create(
-            user=user,
-            reference=reference,
-            amount=amount_val,
-            status="initiated",       # created but not paid
-            confirm_status="pending",
-            metadata=metadata or {}
+        # amount is computed from the products; a client-sent amount is ignored
+        order = place_order(
+            request.user,
+            serializer.validated_data["items"],
+            reference,
+            serializer.validated_data["metadata"],
         )
 
         # respond with serialized order
@@ -278,32 +359,32 @@ class OrderMarkPaidView(APIView):
 
     def post(self, request, pk):
         user = request.user
-        order = get_object_or_404(Order, pk=pk)
-
-        # ensure only owner (or admin) can mark the order as paid
-        if order.user != user and not user.is_superuser:
-            return Response({"detail": "Not allowed"}, status=status.HTTP_403_FORBIDDEN)
-
-        # set a simple flag inside metadata to mark user payment attempt
-        meta = order.metadata or {}
-        meta["user_marked_paid"] = True
-        meta["user_marked_paid_at"] = timezone.now().isoformat()
-        order.metadata = meta
-        order.save(update_fields=["metadata"])
-
-        # Send notification to admin (use your existing util)
-        try:
-            product_names = ", ".join([i.get("name", "") for i in meta.get("items", [])]) if meta.get("items") else "Product(s)"
-            context = {
-                "customer_name": order.user.username,
-                "product_names": product_names,
-                "amount": str(order.amount),
-                "reference": order.reference,
-            }
-            admin_email = getattr(settings, "ADMIN_EMAIL", settings.DEFAULT_FROM_EMAIL)
-            send_transaction_emails(admin_email, order.user.email, context)
-        except Exception as e:
-            print(f"Error sending notify email to admin: {e}")
+        orders = Order.objects.filter(pk=pk)
+        # only the owner (or admin) can mark the order as paid
+        if not user.is_superuser:
+            orders = orders.filter(user=user)
+
+        # set a simple flag inside metadata to mark user payment attempt; the
+        # notifications are queued with it and sent by run_email_worker
+        with transaction.atomic():
+            marked = orders.transition("mark_paid", metadata={
+                "user_marked_paid": True,
+                "user_marked_paid_at": timezone.now().isoformat(),
+            })
+            if marked:
+                order = marked[0]
+                if order.user_id == user.id:
+                    order.user = user
+                # the stock stays held while the admin checks the payment
+                inventory.extend_holds(order, settings.INVENTORY_PAID_HOLD_TTL)
+                admin_email = getattr(settings, "ADMIN_EMAIL", settings.DEFAULT_FROM_EMAIL)
+                send_transaction_emails(admin_email, order.user.email, order_email_context(order))
+
+        if not marked:
+            order = get_object_or_404(Order, pk=pk)
+            if order.user_id != user.id and not user.is_superuser:
+                return Response({"detail": "Not allowed"}, status=status.HTTP_403_FORBIDDEN)
+            return Response({"detail": "Order can no longer be marked as paid."}, status=status.HTTP_400_BAD_REQUEST)
 
         serializer = OrderSerializer(order)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -329,43 +410,15 @@ class ConfirmPaymentView(APIView):
     permission_classes = [permissions.IsAdminUser]
 
     def post(self, request, pk):
-        order = get_object_or_404(Order, pk=pk)
-
-        # Update confirmation details
-        order.status = "paid"
-        order.confirmed = True
-        order.confirm_status = "confirmed"
-        order.save()
-
-        # ✅ Send styled confirmation email
-        logo_url = f"{settings.SITE_URL}/static/images/heromefab.jpg"
-        
-        year = datetime.now().year
-
-        html_content = render_to_string("email_template.html", {
-            "logo_url": logo_url,
-            "year": year,
-            "body_content": f"""
-                <h2>Payment Confirmed</h2>
-                <p>Hi {order.user.username},</p>
-                <p>Your payment of ₦{order.amount}  has been confirmed. Please login and check your Transaction for confirmation.</p>
-                <p>Your order is now being processed. Thank you for shopping with <span class="highlight">Herome_Fab</span>!</p>
-                <p><b>Transaction Reference:</b> {order.reference}</p>
-            """
-        })
-        text_content = strip_tags(html_content)
-
-        msg = EmailMultiAlternatives(
-            subject=f"Payment Confirmed - Reference {order.reference}",
-            body=text_content,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[order.user.email],
-        )
-        msg.attach_alternative(html_content, "text/html")
-        msg.send(fail_silently=False)
+        # pending -> confirmed in one guarded UPDATE; held stock becomes a real
+        # decrement and the mail is queued in the same transaction
+        orders = confirm_payments(Order.objects.filter(pk=pk))
+        if not orders:
+            get_object_or_404(Order, pk=pk)
+            return Response({"detail": "Order is already confirmed."}, status=status.HTTP_400_BAD_REQUEST)
 
         # ✅ Return updated order data to frontend
-        serializer = OrderSerializer(order)
+        serializer = OrderSerializer(orders[0])
         return Response(serializer.data, status=status.HTTP_200_OK)
     
 
@@ -373,26 +426,41 @@ class ReversePaymentView(APIView):
     permission_classes = [IsAdminUser]
 
     def post(self, request, pk):
-        order = get_object_or_404(Order, pk=pk)
-
-        # Only reverse if it's already confirmed
-        if order.confirm_status != "confirmed":
+        # Only reverse if it's already confirmed; the units go back into stock
+        orders = reverse_payments(Order.objects.filter(pk=pk))
+        if not orders:
+            get_object_or_404(Order, pk=pk)
             return Response({"detail": "Order is not confirmed yet."}, status=status.HTTP_400_BAD_REQUEST)
 
-        order.status = "pending"
-        order.confirmed = False
-        order.confirm_status = "pending"
-        order.save()
-
-        serializer = OrderSerializer(order)
+        serializer = OrderSerializer(orders[0])
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+# Admin: confirm or reverse many orders at once
+class OrderBulkStatusView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = OrderBulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data["ids"]
+        apply = confirm_payments if serializer.validated_data["action"] == "confirm" else reverse_payments
+
+        updated = sorted(order.pk for order in apply(Order.objects.filter(pk__in=ids)))
+        done = set(updated)
+        return Response({
+            "action": serializer.validated_data["action"],
+            "updated": updated,
+            "skipped": sorted({pk for pk in ids if pk not in done}),
+        }, status=status.HTTP_200_OK)
+
+
 
 class SaleListCreateView(generics.ListCreateAPIView):
-    queryset = Sale.objects.all().order_by('-id')
+    queryset = Sale.objects.all().order_by('-created_at', '-id')
     serializer_class = SaleSerializer
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = KeysetPagination
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -404,6 +472,72 @@ class SaleRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAdminUser]
 
 
+class ExportView(APIView):
+    """
+    Admin export streamed as CSV (default, ?format=csv) or NDJSON
+    (?format=ndjson), newest rows last. Subclasses give the queryset and columns.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    renderer_classes = [exports.CSVRenderer, exports.NDJSONRenderer]
+    columns = ()
+    export_name = "export"
+
+    def get(self, request):
+        return exports.streaming_export(
+            self.get_queryset(), self.columns, request.accepted_renderer.format, self.export_name
+        )
+
+    def handle_exception(self, exc):
+        # errors are JSON whichever format was asked for
+        self.request.accepted_renderer = ORJSONRenderer()
+        self.request.accepted_media_type = ORJSONRenderer.media_type
+        return super().handle_exception(exc)
+
+
+class OrderExportView(ExportView):
+    """Every order (same filters as the order list), joined with its user."""
+    columns = exports.ORDER_EXPORT_COLUMNS
+    export_name = "orders"
+
+    def get_queryset(self):
+        return OrderFilters(self.request.query_params).filter(Order.objects.order_by("id"), allow_user=True)
+
+
+class SaleExportView(ExportView):
+    """The sales ledger, optionally narrowed with ?from= / ?to= on date_paid."""
+    columns = exports.SALE_EXPORT_COLUMNS
+    export_name = "sales"
+
+    def get_queryset(self):
+        return SaleFilters(self.request.query_params).filter(Sale.objects.order_by("id"))
+
+
+class SalesSummaryView(APIView):
+    """
+    GET ?from=YYYY-MM-DD&to=YYYY-MM-DD&granularity=day|month (default month):
+    revenue, costs, profit, loss, net and margin per period of date_paid,
+    answered from the SalesRollup table rather than the Sale ledger.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        granularity = request.query_params.get("granularity", "month")
+        if granularity not in ("day", "month"):
+            return Response({"granularity": "must be day or month"}, status=status.HTTP_400_BAD_REQUEST)
+        bounds = {}
+        for name in ("from", "to"):
+            raw = request.query_params.get(name)
+            try:
+                bounds[name] = parse_date(raw) if raw else None
+            except ValueError:
+                bounds[name] = None
+            if raw and bounds[name] is None:
+                return Response({name: "must be a date (YYYY-MM-DD)"}, status=status.HTTP_400_BAD_REQUEST)
+        if bounds["from"] and bounds["to"] and bounds["from"] > bounds["to"]:
+            return Response({"detail": "from must not be after to."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(sales_summary(granularity, bounds["from"], bounds["to"]))
+
+
 
 
 
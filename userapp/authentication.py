@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import CustomUser
+
+# Claims CustomTokenObtainPairSerializer.get_token puts in every token.
+CLAIM_FIELDS = ("username", "email", "is_staff", "is_superuser")
+
+# What a token is checked against on every request: tokens outlive demotions,
+# deactivations, deletes and profile edits (refresh copies the claims), the
+# user row doesn't.
+AUTH_STATE_FIELDS = ("username", "email", "is_active", "is_staff", "is_superuser")
+
+# Never cached: the password hash and the verification code are loaded from
+# the database if something actually reads them.
+SECRET_FIELDS = ("password", "verification_code")
+
+
+def _user_key(pk):
+    return f"auth-user:{pk}"
+
+
+def _state_key(pk):
+    return f"auth-state:{pk}"
+
+
+def auth_state(pk):
+    """
+    {username, email, is_active, is_staff, is_superuser} of user pk, or None if there is no such
+    user. Cached (USER_CACHE_TIMEOUT) and dropped by userapp.signals on every
+    save or delete of the user.
+    """
+    state = cache.get(_state_key(pk))
+    if state is None:
+        row = CustomUser.objects.filter(pk=pk).values(*AUTH_STATE_FIELDS).first()
+        # a missing user is cached too ({}), so a deleted account's tokens don't query every time
+        state = row or {}
+        cache.set(_state_key(pk), state, settings.USER_CACHE_TIMEOUT)
+    return state or None
+
+
+def cached_user(pk):
+    """
+    {attname: value} of user pk without SECRET_FIELDS, from the cache
+    (USER_CACHE_TIMEOUT) or the database; None if there is no such user.
+    """
+    row = cache.get(_user_key(pk))
+    if row is None:
+        names = [f.attname for f in CustomUser._meta.concrete_fields if f.attname not in SECRET_FIELDS]
+        row = CustomUser.objects.filter(pk=pk).values(*names).first()
+        if row is not None:
+            cache.set(_user_key(pk), row, settings.USER_CACHE_TIMEOUT)
+    return row
+
+
+def invalidate_user(pk):
+    cache.delete_many([_user_key(pk), _state_key(pk)])
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without the per-request user query: request.user is a
+    CustomUser built from the token's id plus the cached auth_state()
+    (username, email, is_active, is_staff, is_superuser), which is all
+    permission checks and FK writes need. A deleted or deactivated user is
+    rejected, and nothing but the id is taken from the token, so a stale token
+    never brings back old rights or an old email (nor saves them over the
+    current ones). Every other field is deferred and filled from cached_user()
+    on first access (see CustomUser.refresh_from_db). Tokens issued without
+    the claims fall back to the database lookup.
+    """
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+        if any(claim not in validated_token for claim in CLAIM_FIELDS):
+            return super().get_user(validated_token)
+
+        pk = CustomUser._meta.pk.to_python(user_id)
+        state = auth_state(pk)
+        if state is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if not state["is_active"]:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+
+        loaded = {"id": pk, **state}
+        # from_db() wants the loaded values in concrete field order
+        names = [f.attname for f in CustomUser._meta.concrete_fields if f.attname in loaded]
+        user = CustomUser.from_db(router.db_for_read(CustomUser), names, [loaded[name] for name in names])
+        user.from_claims = True
+        return user
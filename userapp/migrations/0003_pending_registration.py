@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userapp', '0002_customuser_is_verified_customuser_verification_code'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingRegistration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254, unique=True)),
+                ('username', models.CharField(max_length=150)),
+                ('password', models.CharField(max_length=128)),
+                ('verification_code', models.CharField(max_length=6)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -16,8 +16,41 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return self.username
 
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # A user built from JWT claims (userapp.authentication) loads whatever
+        # else is needed from the user cache in one go, not a query per field.
+        if getattr(self, "from_claims", False) and fields and set(fields) <= self.get_deferred_fields():
+            from .authentication import cached_user
+
+            row = cached_user(self.pk)
+            if row is not None:
+                for name in self.get_deferred_fields() & row.keys():
+                    self.__dict__[name] = row[name]
+                self.from_claims = False
+                # the cache holds no secrets (password, verification code): those still come from the database
+                fields = [name for name in fields if name in self.get_deferred_fields()]
+                if not fields:
+                    return
+        super().refresh_from_db(using, fields, from_queryset)
+
     def generate_and_set_verification_code(self):
         """Create a new code and save it."""
         self.verification_code = generate_verification_code()
         self.save()
         return self.verification_code
+
+
+class PendingRegistration(models.Model):
+    """
+    Database copy of an unverified sign-up, used by userapp.pending only when
+    the cache (Redis) is unreachable. Holds a hashed password, never the raw one.
+    """
+    email = models.EmailField(unique=True)
+    username = models.CharField(max_length=150)
+    password = models.CharField(max_length=128)
+    verification_code = models.CharField(max_length=6)
+    attempts = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.email
@@ -0,0 +1,99 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+from django_redis.exceptions import ConnectionInterrupted
+
+from .models import PendingRegistration
+
+logger = logging.getLogger(__name__)
+
+# Unverified sign-ups, shared by every worker: kept in Redis under a TTL, or in
+# the PendingRegistration table while Redis is down. Entries hold the password
+# hash, so VerifyCodeView creates the user without ever seeing the raw password.
+
+
+def normalize(email):
+    return email.strip().lower()
+
+
+def _key(email):
+    return f"pending-registration:{normalize(email)}"
+
+
+def _attempts_key(email):
+    return f"pending-registration-attempts:{normalize(email)}"
+
+
+def save_pending(email, username, password, verification_code):
+    entry = {
+        "email": email,
+        "username": username,
+        "password": make_password(password),
+        "verification_code": str(verification_code),
+    }
+    ttl = settings.PENDING_REGISTRATION_TTL
+    try:
+        cache.set(_key(email), entry, ttl)
+        cache.delete(_attempts_key(email))
+        return entry
+    except ConnectionInterrupted:
+        logger.warning("cache unavailable, storing pending registration for %s in the database", email)
+
+    now = timezone.now()
+    PendingRegistration.objects.filter(expires_at__lte=now).delete()
+    PendingRegistration.objects.update_or_create(
+        email=normalize(email),
+        defaults={
+            "username": username,
+            "password": entry["password"],
+            "verification_code": entry["verification_code"],
+            "attempts": 0,
+            "expires_at": now + timedelta(seconds=ttl),
+        },
+    )
+    return entry
+
+
+def get_pending(email):
+    try:
+        entry = cache.get(_key(email))
+        if entry is not None:
+            return entry
+    except ConnectionInterrupted:
+        pass
+    row = PendingRegistration.objects.filter(email=normalize(email), expires_at__gt=timezone.now()).first()
+    if row is None:
+        return None
+    return {
+        "email": row.email,
+        "username": row.username,
+        "password": row.password,
+        "verification_code": row.verification_code,
+    }
+
+
+def record_failed_attempt(email):
+    """Count a wrong code; returns the number of failures so far."""
+    try:
+        if cache.get(_key(email)) is not None:
+            key = _attempts_key(email)
+            cache.add(key, 0, settings.PENDING_REGISTRATION_TTL)
+            return cache.incr(key)
+    except ConnectionInterrupted:
+        pass
+    PendingRegistration.objects.filter(email=normalize(email)).update(attempts=F("attempts") + 1)
+    row = PendingRegistration.objects.filter(email=normalize(email)).values_list("attempts", flat=True).first()
+    return row or 0
+
+
+def delete_pending(email):
+    try:
+        cache.delete_many([_key(email), _attempts_key(email)])
+    except ConnectionInterrupted:
+        pass
+    PendingRegistration.objects.filter(email=normalize(email)).delete()
@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_user
+from .models import CustomUser
+
+
+# Drop the cached row behind ClaimsJWTAuthentication on profile updates,
+# password changes and deletes (after commit, so it can't be re-cached stale).
+@receiver([post_save, post_delete], sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: invalidate_user(pk))
@@ -1,3 +1,66 @@
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from . import pending
+from .models import CustomUser
+from .serializers import CustomTokenObtainPairSerializer
+
+
+class ClaimsAuthenticationTests(TestCase):
+    url = "/api/users/profile/"
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username="ada", email="old@example.com", password="pw123456")
+        # issued before the email change, still valid afterwards
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def change_email(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.email = "new@example.com"
+            self.user.save()
+
+    def test_profile_is_not_served_from_the_token(self):
+        self.assertEqual(self.client.get(self.url).json()["email"], "old@example.com")
+        self.change_email()
+        self.assertEqual(self.client.get(self.url).json()["email"], "new@example.com")
+
+    def test_old_token_does_not_write_back_old_email(self):
+        self.client.get(self.url)
+        self.change_email()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(self.url, {"phone_number": "08012345678"})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.email, self.user.phone_number), ("new@example.com", "08012345678"))
+
+    def test_user_cache_holds_no_secrets(self):
+        from .authentication import cached_user
+
+        row = cached_user(self.user.pk)
+        self.assertEqual(row["email"], "old@example.com")
+        self.assertNotIn("password", row)
+        self.assertNotIn("verification_code", row)
+
+
+class VerifyCodeTests(TestCase):
+    url = "/api/users/verify/"
+
+    def setUp(self):
+        cache.clear()
+        pending.save_pending("ada@example.com", "ada", "pw123456", 123456)
+
+    def test_verify_creates_the_user(self):
+        response = APIClient().post(self.url, {"email": "ada@example.com", "code": "123456"})
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(CustomUser.objects.get(username="ada").is_verified)
+
+    def test_concurrent_verify_loses_with_400(self):
+        # the other request created the user but hasn't removed the pending entry yet
+        CustomUser.objects.create(username="ada", email="ada@example.com", is_verified=True)
+        response = APIClient().post(self.url, {"email": "ada@example.com", "code": "123456"})
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertEqual(CustomUser.objects.filter(username="ada").count(), 1)
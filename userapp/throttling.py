@@ -0,0 +1,105 @@
+import logging
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+# Refill and take one token from every bucket in KEYS, all or nothing, in one
+# round trip. ARGV holds (capacity, tokens per second) for each key; time comes
+# from the Redis server so workers with skewed clocks agree. Returns
+# {allowed, seconds until a token is available}.
+TOKEN_BUCKET_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tokens, wait = {}, 0
+for i, key in ipairs(KEYS) do
+    local capacity, rate = tonumber(ARGV[2 * i - 1]), tonumber(ARGV[2 * i])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local level = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    level = math.min(capacity, level + math.max(0, now - ts) * rate)
+    if level < 1 then
+        wait = math.max(wait, (1 - level) / rate)
+    end
+    tokens[i] = level
+end
+for i, key in ipairs(KEYS) do
+    local capacity, rate = tonumber(ARGV[2 * i - 1]), tonumber(ARGV[2 * i])
+    local level = tokens[i]
+    if wait == 0 then
+        level = level - 1
+    end
+    redis.call('HSET', key, 'tokens', tostring(level), 'ts', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+return {wait == 0 and 1 or 0, tostring(wait)}
+"""
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+_script = None
+
+
+def parse_rate(rate):
+    """Parse a DRF-style rate, "5/min" -> (5, 60)."""
+    num, period = rate.split("/")
+    return int(num), PERIODS[period[0]]
+
+
+def token_bucket_script():
+    global _script
+    if _script is None:
+        _script = get_redis_connection("default").register_script(TOKEN_BUCKET_LUA)
+    return _script
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket per client IP and per submitted email/username, shared by all
+    workers through Redis. The view names its bucket with `throttle_scope`;
+    AUTH_THROTTLE_RATES[scope] gives DRF-style rates ("5/min") for "ip" and
+    "identity": that many requests in a burst, refilled evenly over the period.
+    Only POSTs are counted. If Redis is unreachable requests are let through.
+    """
+    identity_fields = ("email", "username")
+
+    def get_identity(self, request):
+        data = request.data if hasattr(request.data, "get") else {}
+        for field in self.identity_fields:
+            value = data.get(field)
+            if isinstance(value, str) and value.strip():
+                return value.strip().lower()[:254]
+        return None
+
+    def get_buckets(self, request, scope):
+        rates = settings.AUTH_THROTTLE_RATES[scope]
+        buckets = [(f"throttle:{scope}:ip:{self.get_ident(request)}", rates["ip"])]
+        identity = self.get_identity(request)
+        if identity and rates.get("identity"):
+            buckets.append((f"throttle:{scope}:id:{identity}", rates["identity"]))
+        return buckets
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        scope = getattr(view, "throttle_scope", None)
+        if request.method != "POST" or scope not in settings.AUTH_THROTTLE_RATES:
+            return True
+
+        keys, args = [], []
+        for key, rate in self.get_buckets(request, scope):
+            num_requests, duration = parse_rate(rate)
+            keys.append(key)
+            args += [num_requests, num_requests / duration]
+        try:
+            allowed, wait = token_bucket_script()(keys=keys, args=args)
+        except RedisError as e:
+            logger.warning("throttle unavailable, letting %s request through: %s", scope, e)
+            return True
+        self.wait_seconds = float(wait)
+        return bool(allowed)
+
+    def wait(self):
+        return self.wait_seconds
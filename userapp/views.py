@@ -4,13 +4,14 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
 from .models import CustomUser
 from .serializers import UserSerializer, RegisterSerializer, CustomTokenObtainPairSerializer
+from products.emails import queue_kind_email
 
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
-from datetime import datetime
 from django.conf import settings
-import random
+from django.db import IntegrityError, transaction
+from django.utils.crypto import constant_time_compare
+import secrets
+from . import pending
+from .throttling import TokenBucketThrottle
 
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
@@ -20,12 +21,11 @@ from rest_framework.permissions import AllowAny
 token_generator = PasswordResetTokenGenerator()
 
 
-# Temporary store for unverified registrations
-PENDING_REGISTRATIONS = {}
-
 # Register endpoint (open)
 class RegisterView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "register"
 
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
@@ -39,64 +39,16 @@ class RegisterView(APIView):
                 return Response({"detail": "Email already registered."}, status=status.HTTP_400_BAD_REQUEST)
 
             # Generate verification code
-            verification_code = random.randint(100000, 999999)
+            verification_code = 100000 + secrets.randbelow(900000)
+
+            # Held in the shared pending store (password hashed) until verified
+            pending.save_pending(email, username, password, verification_code)
 
-            # Store temporarily in memory (not in DB yet)
-            PENDING_REGISTRATIONS[email] = {
+            queue_kind_email("verify_account", [email], {
                 "username": username,
-                "password": password,
                 "verification_code": verification_code,
-            }
-
-            year = datetime.now().year
-            logo_url = f"{settings.SITE_URL}/static/images/heromefab.jpg"
-
-            # ✨ Styled email
-            html_content = render_to_string("email_template.html", {
-                "logo_url": logo_url,
-                "year": year,
-                "body_content": f"""
-                    <h2 style="color:#ff6600; text-align:center;">Welcome to Herome_Fab!</h2>
-                    <p>Hi <b>{username}</b>,</p>
-                    <p>Thank you for joining <span class="highlight">Herome_Fab</span> — Nigeria’s leading fashion community.</p>
-                    <p>To complete your registration, please use the verification code below:</p>
-
-                    <div style="
-                        text-align:center;
-                        margin:30px 0;
-                        background:#fff3e6;
-                        border-radius:10px;
-                        padding:20px;
-                        display:inline-block;
-                        box-shadow:0 0 15px rgba(255,102,0,0.2);
-                    ">
-                        <h1 style="
-                            color:#ff6600;
-                            font-size:36px;
-                            letter-spacing:8px;
-                            margin:0;
-                            font-weight:700;
-                        ">
-                            {verification_code}
-                        </h1>
-                        <p style="margin-top:8px; color:#555;">(Enter this code in the verification page)</p>
-                    </div>
-
-                    <p>Once verified, you can log in and start shopping for amazing fashion products.</p>
-                    <p style="margin-top:25px;">Cheers,<br><b>Herome_Fab</b></p>
-                """
             })
 
-            text_content = strip_tags(html_content)
-
-            subject = "Verify Your Herome_Fab Account"
-            from_email = "Herome_Fab <no-reply@heromefab.com>"
-            to = [email]
-
-            msg = EmailMultiAlternatives(subject, text_content, from_email, to)
-            msg.attach_alternative(html_content, "text/html")
-            msg.send()
-
             return Response({"detail": "Verification code sent to your email."}, status=status.HTTP_201_CREATED)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -105,6 +57,8 @@ class RegisterView(APIView):
 # Verify user email with code
 class VerifyCodeView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "verify"
 
     def post(self, request):
         email = request.data.get("email")
@@ -116,26 +70,36 @@ class VerifyCodeView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        pending = PENDING_REGISTRATIONS.get(email)
-        if not pending:
+        entry = pending.get_pending(email)
+        if not entry:
             return Response({"detail": "No pending registration found for this email."},
                             status=status.HTTP_404_NOT_FOUND)
 
-        if str(pending["verification_code"]) == str(code):
-            # ✅ Create the user now
-            user = CustomUser.objects.create_user(
-                username=pending["username"],
-                email=email,
-                password=pending["password"],
-                is_verified=True
-            )
-            user.save()
-
-            # remove from temporary store
-            del PENDING_REGISTRATIONS[email]
+        if constant_time_compare(entry["verification_code"], str(code).strip()):
+            # ✅ Create the user now (the stored password is already hashed)
+            try:
+                with transaction.atomic():
+                    CustomUser.objects.create(
+                        username=entry["username"],
+                        email=CustomUser.objects.normalize_email(entry["email"]),
+                        password=entry["password"],
+                        is_verified=True
+                    )
+            except IntegrityError:
+                # a concurrent verify of the same sign-up created it first
+                return Response({"detail": "This account is already verified."},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            # remove from pending store
+            pending.delete_pending(email)
 
             return Response({"detail": "Account verified and created successfully."}, status=status.HTTP_201_CREATED)
 
+        if pending.record_failed_attempt(email) >= settings.PENDING_REGISTRATION_MAX_ATTEMPTS:
+            pending.delete_pending(email)
+            return Response({"detail": "Too many invalid codes. Please register again."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
         return Response({"detail": "Invalid verification code."}, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -215,6 +179,8 @@ class CreateUserByStaffView(generics.CreateAPIView):
 # Login
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "login"
 
 
 
@@ -222,6 +188,8 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 
 class PasswordResetRequestView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "password_reset"
 
     def post(self, request):
         email = request.data.get("email")
@@ -239,36 +207,7 @@ class PasswordResetRequestView(APIView):
 
         reset_link = f"{settings.FRONTEND_URL}/reset-password/{uid}/{token}"
 
-        year = datetime.now().year
-        logo_url = f"{settings.SITE_URL}/static/images/heromefab.jpg"
-
-        html_content = render_to_string("email_template.html", {
-            "logo_url": logo_url,
-            "year": year,
-            "body_content": f"""
-                <h2>Password Reset</h2>
-                <p>Hello <b>{user.username}</b>,</p>
-                <p>You requested to reset your password. Below is the password reset link</p>
-                <p>
-                    <a href="{reset_link}"
-                       style="display:inline-block;padding:12px 20px;
-                       background:#ff6600;color:#fff;border-radius:6px;
-                       text-decoration:none;">
-                       Reset Password Link
-                    </a>
-                </p>
-                <p>If you didn’t request this, ignore this email.</p>
-            """
-        })
-
-        msg = EmailMultiAlternatives(
-            "Reset Your Password",
-            strip_tags(html_content),
-            settings.DEFAULT_FROM_EMAIL,
-            [email],
-        )
-        msg.attach_alternative(html_content, "text/html")
-        msg.send()
+        queue_kind_email("password_reset", [email], {"username": user.username, "reset_link": reset_link})
 
         return Response({"detail": "Password reset link sent"}, status=200)
 